@@ -0,0 +1,110 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+"""
+@summary:
+Benchmarks, not part of the installed package.
+Run from the source root, e.g.::
+
+	python -m bench.client --out before.json
+	... (change the code)
+	python -m bench.client --compare before.json
+
+Results are JSON: {"meta": {...}, "results": {case name: nanoseconds per call}}
+@author: Ruben Reifenberg
+"""
+
+import json
+import platform
+import sys
+import time
+
+
+def ns_per_call(run, number, repeat):
+	"""
+	:param run: callable, run(n) does n calls of the measured operation
+	:returns: nanoseconds per call, the best of repeat runs
+	"""
+	run(min(number,1000)) # warm up caches
+	best = None
+	for i in range(repeat):
+		t0 = time.perf_counter_ns()
+		run(number)
+		t = time.perf_counter_ns()-t0
+		if (best is None) or (t < best):
+			best = t
+	return best/float(number)
+
+
+def meta():
+	import rrlog
+	return {
+		"python": sys.version.split()[0],
+		"implementation": platform.python_implementation(),
+		"platform": platform.platform(),
+		"rrlog": rrlog.__version__,
+		"time": time.strftime("%Y-%m-%d %H:%M:%S"),
+		}
+
+
+def report(results, out=None, compare=None):
+	"""
+	Writes the results as JSON (to the file out, or stdout), and prints a comparison with a previous result file.
+	:param results: {case name: ns per call}
+	"""
+	data = {"meta":meta(), "results":results}
+	if out is None:
+		json.dump(data, sys.stdout, indent=1, sort_keys=True)
+		sys.stdout.write("\n")
+	else:
+		with open(out,"w") as f:
+			json.dump(data, f, indent=1, sort_keys=True)
+			
+	if compare is not None:
+		with open(compare) as f:
+			old = json.load(f)["results"]
+		sys.stderr.write("%-28s %10s %10s %8s\n"%("case","old ns","new ns","new/old"))
+		for name in sorted(results):
+			if name in old:
+				sys.stderr.write("%-28s %10.0f %10.0f %8.2f\n"%(name, old[name], results[name], results[name]/old[name]))
+
+
+def main(cases, argv=None):
+	"""
+	Command line: measures the cases and reports.
+	:param cases: list of (name, run), see L{ns_per_call}
+	"""
+	import argparse
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--number", type=int, default=20000, help="calls per run")
+	parser.add_argument("--repeat", type=int, default=5, help="runs per case, the best is taken")
+	parser.add_argument("--out", help="JSON file to write, default stdout")
+	parser.add_argument("--compare", help="JSON file of a previous run, prints the ratios to stderr")
+	parser.add_argument("-k", dest="select", help="run the cases containing this string only")
+	args = parser.parse_args(argv)
+	
+	results = {}
+	for name,run in cases:
+		if (args.select is None) or (args.select in name):
+			results[name] = ns_per_call(run, args.number, args.repeat)
+	report(results, args.out, args.compare)
+	return results
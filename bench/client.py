@@ -0,0 +1,139 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+"""
+@summary:
+Client side cost of a log call (Log.__call__), with a server that does nothing.
+Compared with the standard logging module, which gets a handler that does nothing but getMessage().
+
+	python -m bench.client [--out file.json] [--compare old.json] [-k name]
+
+@author: Ruben Reifenberg
+"""
+
+import logging
+
+from rrlog import Log, logging23
+import bench
+
+STACK_DEPTH = 25 # the log calls happen with this count of frames below, to let stackMax matter
+
+
+class NullServer(object):
+	"""
+	Takes the log data and does nothing.
+	"""
+	def addClient(self):
+		return 0
+	def log(self, jobdata):
+		pass
+	def log_batch(self, jobdatas):
+		pass
+
+
+class _GetMessageHandler(logging.Handler):
+	"""
+	Stdlib handler doing the minimal work: the message.
+	"""
+	def emit(self, record):
+		record.getMessage()
+
+
+def _atDepth(func, depth=STACK_DEPTH):
+	"""
+	:returns: run(n) that calls func n times, from a stack with depth frames more
+	"""
+	def down(i, n):
+		if i > 0:
+			return down(i-1, n)
+		for x in range(n):
+			func()
+	return lambda n: down(depth, n)
+
+
+def _logCase(msg="hello", cat="", args=None, **logkwargs):
+	log = Log(server=NullServer(), **logkwargs)
+	return _atDepth(lambda: log(msg, cat, args=args)), log
+
+
+def _stdlibLogger(name, handler, level=logging.DEBUG):
+	logger = logging.getLogger("bench.client.%s"%(name))
+	logger.propagate = False
+	logger.handlers = [handler]
+	logger.setLevel(level)
+	return logger
+
+
+def cases():
+	"""
+	:returns: list of (name, run(n))
+	"""
+	res = []
+	def add(name, run):
+		res.append((name,run))
+	
+	add("default", _logCase()[0])
+	add("extractStack-off", _logCase(extractStack=False)[0])
+	for stackMax in (1,5,20):
+		add("stackMax-%d"%(stackMax), _logCase(stackMax=stackMax)[0])
+	add("seFilesExclude", _logCase(seFilesExclude=lambda fname: fname.endswith("threading.py"))[0])
+	add("args", _logCase("x=%s y=%s", args=(1,2))[0])
+	
+	run,log = _logCase()
+	log.set_sticked_items({"ip":"1.2.3.4", "user":"abc"})
+	add("sticked-items", run)
+	
+	run,log = _logCase()
+	def sticked(n, run=run, log=log):
+		with log.sticked({"request":42}):
+			run(n)
+	add("sticked-context", sticked)
+	
+	add("cat-disabled", _logCase(cat="D", catsDisable=("D",))[0])
+	log = Log(server=NullServer(), catsDisable=("D",))
+	debug = log.for_cat("D")
+	add("for_cat-disabled", _atDepth(lambda: debug("hello")))
+	
+	log = Log(server=NullServer(), seFilesExclude=logging23.seFilesExclude)
+	logger = _stdlibLogger("rrlog", logging23.handler(log))
+	add("logging23", _atDepth(lambda: logger.info("hello %s", 1)))
+	logger = _stdlibLogger("rrlog-disabled", logging23.handler(log), level=logging.INFO)
+	add("logging23-disabled", _atDepth(lambda: logger.debug("hello %s", 1)))
+	logger = _stdlibLogger("rrlog-bridge", logging23.bridge(log))
+	add("logging23-bridge", _atDepth(lambda: logger.info("hello %s", 1)))
+	logger = _stdlibLogger("rrlog-bridge-stack", logging23.bridge(log, extraStack=4))
+	add("logging23-bridge-extraStack-4", _atDepth(lambda: logger.info("hello %s", 1)))
+	logger = _stdlibLogger("rrlog-queued", logging23.queued(log))
+	add("logging23-queued", _atDepth(lambda: logger.info("hello %s", 1)))
+	log = Log(server=NullServer(), catsDisable=("I",))
+	logger = _stdlibLogger("rrlog-bridge-catdisabled", logging23.bridge(log))
+	add("logging23-bridge-cat-disabled", _atDepth(lambda: logger.info("hello %s", 1)))
+	
+	logger = _stdlibLogger("stdlib", _GetMessageHandler())
+	add("stdlib", _atDepth(lambda: logger.info("hello %s", 1)))
+	logger = _stdlibLogger("stdlib-disabled", _GetMessageHandler(), level=logging.INFO)
+	add("stdlib-disabled", _atDepth(lambda: logger.debug("hello %s", 1)))
+	return res
+
+
+if __name__ == "__main__":
+	bench.main(cases())
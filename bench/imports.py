@@ -0,0 +1,97 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+"""
+@summary:
+Import time: each case runs in a fresh interpreter, measuring the statements only (not the interpreter start).
+
+	python -m bench.imports [--out file.json] [--compare old.json] [--modules]
+
+--modules prints the notable standard modules each case loads (e.g. logging, json, sqlalchemy).
+@author: Ruben Reifenberg
+"""
+
+import os
+import subprocess
+import sys
+
+import bench
+
+CASES = (
+	("import-rrlog", "import rrlog"),
+	("import-printwriter", "from rrlog.server import printwriter"),
+	("import-filewriter", "from rrlog.server import filewriter"),
+	("create-printlog", "from rrlog.server import printwriter; printwriter.createLocalLog()"),
+	("import-socketclient", "from rrlog import socketclient"),
+	("import-logging", "import logging"), # for comparison
+	)
+
+NOTABLE = ("logging","json","warnings","traceback","datetime","sqlalchemy","asyncio","xmlrpc","socket")
+
+_SCRIPT = """
+import sys,time
+before = set(sys.modules)
+t = time.perf_counter_ns()
+%s
+t = time.perf_counter_ns()-t
+print(t)
+print(" ".join(sorted(set(sys.modules)-before)))
+"""
+
+
+def measure(stmt, repeat):
+	"""
+	:returns: (best ns, names of the modules loaded)
+	"""
+	root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+	env = dict(os.environ)
+	env["PYTHONPATH"] = os.pathsep.join([root]+[x for x in [env.get("PYTHONPATH")] if x])
+	best = None
+	for i in range(repeat):
+		out = subprocess.check_output([sys.executable, "-c", _SCRIPT%(stmt)], env=env, universal_newlines=True)
+		ns,modules = out.split("\n")[:2]
+		if (best is None) or (int(ns) < best):
+			best = int(ns)
+	return best, modules.split()
+
+
+def main(argv=None):
+	import argparse
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--repeat", type=int, default=10, help="interpreter runs per case, the best is taken")
+	parser.add_argument("--out", help="JSON file to write, default stdout")
+	parser.add_argument("--compare", help="JSON file of a previous run, prints the ratios to stderr")
+	parser.add_argument("--modules", action="store_true", help="print notable modules loaded by each case")
+	args = parser.parse_args(argv)
+	
+	results = {}
+	for name,stmt in CASES:
+		results[name],modules = measure(stmt, args.repeat)
+		if args.modules:
+			notable = [m for m in modules if m.split(".")[0] in NOTABLE and "." not in m]
+			sys.stderr.write("%-22s %s\n"%(name, " ".join(notable)))
+	bench.report(results, args.out, args.compare)
+	return results
+
+
+if __name__ == "__main__":
+	main()
@@ -29,18 +29,51 @@ rrlog - a Rotating Remote LOG.
 
 __version__="0.3.2testing"
 
-import os
 import sys
 import time
+import atexit
+import weakref
+import itertools
 import threading
-import traceback
-import warnings # Python 2.7 hides DeprecationWarning. Use python -Wd
+import contextvars
+from collections import ChainMap
 
-from rrlog.tool import traceToShortStr
-from rrlog import logging23
+from rrlog.tool import traceToShortStr,format_msg
+from rrlog import stack
+from rrlog import identity
+from rrlog import sampling
+from rrlog import record
+from rrlog import instrument
 
 now = time.time
 
+_bursting = None # Logs with collapsed messages, their pending "repeated N times" is logged at exit
+_burstingLock = threading.Lock()
+
+def _endBursts():
+	for log in list(_bursting):
+		log._endBurst()
+
+def _endBurstAtExit(log):
+	global _bursting
+	_burstingLock.acquire()
+	try:
+		if _bursting is None:
+			# registered at first use, to run before the exit hooks of the (earlier imported) servers and writers
+			_bursting = weakref.WeakSet()
+			atexit.register(_endBursts)
+		_bursting.add(log)
+	finally:
+		_burstingLock.release()
+
+
+def __getattr__(name):
+	# rrlog.logging23 imports the standard logging, which is slow. Imported at first use.
+	if name == "logging23":
+		import rrlog.logging23 # not "from rrlog import", that would call me again
+		return sys.modules["rrlog.logging23"]
+	raise AttributeError("module %r has no attribute %r"%(__name__, name))
+
 
 class SilentErrorHandler(object):
 	"""
@@ -78,12 +111,48 @@ class StderrErrorHandler(object):
 
 
 
+_PORTABLE_TYPES = (str,int,float,bool,type(None))
+
+def portable_jobdata(jobdata):
+	"""
+	For remote logging: Deferred message args are sent only if the other side can surely rebuild them.
+	The special items are sent as a dict (see L{Log.sticked}, which may create a ChainMap).
+	Without args, the record is sent without the args field, as by clients before 0.3.2:
+	Servers before 0.3.2 accept that only.
+	
+	:returns: a copy of the jobdata, without args, or with the message formatted when any of its args is not a basic datatype
+		Or the jobdata itself, if the args are portable.
+	"""
+	args = jobdata[record.ARGS]
+	special = jobdata[record.SPECIAL]
+	if (special is not None) and (type(special) is not dict):
+		jobdata = jobdata[:record.SPECIAL]+(dict(special.items()),)+jobdata[record.SPECIAL+1:]
+	if args is None:
+		return jobdata[:record.ARGS]
+	for x in args:
+		if isinstance(x,dict):
+			portable = all(isinstance(v,_PORTABLE_TYPES) for v in x.values())
+		else:
+			portable = isinstance(x,_PORTABLE_TYPES)
+		if not portable:
+			return jobdata[:record.MSG]+(format_msg(jobdata[record.MSG],args),)+jobdata[record.MSG+1:record.ARGS]
+	return jobdata
+	
+	
 class Log(object):
 	"""
 	Instances of this are callable and represent the runtime interface for the application.
+	A Log is thread-safe; multiple threads can share one Log (msgids are unique
+	and gap-free over all threads.)
 	@ivar stackMax: See L{__init__}, can be modified anytime.
 	@ivar traceOffset: See L{__init__}, can be modified anytime.
+	@ivar sampler: See L{__init__}, can be modified anytime.
+	@ivar collapseSecs: See L{__init__}, can be modified anytime.
+	@ivar instruments: See L{__init__}, can be modified anytime.
+	@cvar CALLPATH_CACHE_SIZE: max.count of call sites remembered by a log (see L{callpath_stats})
 	"""
+	CALLPATH_CACHE_SIZE = 1000
+	
 	def __init__(self,
 		server,
 		traceOffset=0,
@@ -95,6 +164,10 @@ class Log(object):
 		seFilesExclude=None,
 		name=None,
 		extractStack=True,
+		sampler=None,
+		collapseSecs=None,
+		instruments=None,
+		stackDepth=True,
 		):
 		"""
 		:param catsEnable:
@@ -145,6 +218,25 @@ class Log(object):
 		
 		:param extractStack: If False, stack extraction is disabled. This improves performance (can be more than twice), but any stack related functionality will not work (e.g.line indention to visualize call hierarchy).
 		:type extractStack: bool
+		
+		:param sampler: None, or a L{rrlog.sampling.Sampler} to limit the messages per call site.
+			Can be modified anytime (ivar "sampler").
+			
+		:param collapseSecs: None, or secs (float). Collapses repeated messages:
+			When the same call site logs the same message (and cat and args) again, within collapseSecs after
+			the first one, the repetitions are not logged but counted.
+			A single message "<message> [repeated N times]" follows when another message is logged (or with flush/close, or at exit).
+			It has the count in the "special" dict (key "repeated").
+			Can be modified anytime (ivar "collapseSecs").
+			
+		:param instruments: None, or L{rrlog.instrument.Instruments} to measure the stack extraction and record building.
+			Can be modified anytime (ivar "instruments").
+			
+		:param stackDepth: If False, the stack depth is not measured and tblen is 0.
+			Measuring walks the whole stack on each log call, whatever stackMax is.
+			Only the stack depth related functionality needs it (e.g. L{rrlog.contrib.stackindent}).
+			Can be modified anytime (ivar "stackDepth").
+		:type stackDepth: bool
 			
 		"""
 		assert (catsEnable is None) or (catsDisable is None), "Can't use both catsEnable and catsDisable same time"
@@ -157,8 +249,11 @@ class Log(object):
 			name = self.__class__.__name__
 			
 		self._on = True
+		self._catLogs = {} # cat:_CatLog, see for_cat()
+		self._catsEnable = None
+		self._catsDisable = None
 		
-		self._msgCount = 0
+		self._msgCounter = itertools.count() # next() is atomic, no lock required
 		self.traceOffset = traceOffset
 		self._server = server
 		self._server.addClient()
@@ -172,126 +267,251 @@ class Log(object):
 		self.catsEnable = catsEnable
 		self.catsDisable = catsDisable
 		self._seFilesExclude = seFilesExclude
+		self._callpaths = stack.CallPathCache(seFilesExclude, maxSize=self.CALLPATH_CACHE_SIZE)
 		self.name = name
 		self._extractStack = extractStack
 		self._sticked_items = {}
+		self._stickedCtx = contextvars.ContextVar("rrlog.sticked", default=None) # ChainMap, see sticked()
+		self.sampler = sampler
+		self.collapseSecs = collapseSecs
+		self._burst = None # _Burst, the recent message for collapseSecs
+		self._burstLock = threading.Lock() # guards _burst and its count, sd, ended
+		self._burstAtExit = False
+		self.instruments = instruments
+		self.stackDepth = stackDepth
 
 
 	def logging23_handler(self):
 		"""
-		Note that, contrary to the Python logging, the rrlog is not designed/tested for threading.
-		
 		:returns: Handler for the Python >=2.3 standard logging framework.
 		"""
+		from rrlog import logging23
 		return logging23.handler(self)
 
 
-	def _getCallPath(self,tb,depth):
+	def logging23_bridge(self, extraStack=0):
 		"""
-		:returns: path,cfuncname where path = ( (filename,lineno), ...), len >=0
-			cfuncname is "" if no traceback available, 
-			None if no cfuncname exists (log call at module level)
-			
-		:param depth: log-internal call depth when the traceback was taken.
-		:type depth: int
-			
+		:returns: Handler for the standard logging framework, faster than L{logging23_handler}:
+			the call path is taken from the LogRecord. See L{rrlog.logging23.bridge}.
 		"""
-		if len(tb) == 0:
-			return (),"" # return ((None,-1),),None
-		
-#		tb = traceback.extract_stack(limit=self._extract_stack_limit(depth)) #limit >=0, 0==no lines etc.
-		calldepth = -1-depth # -1 is current. Ignore current and all previous log-internal calls.
-		
-		try:
-			line = tb[calldepth]
-		except IndexError:
-			# This happens - in the following case:
-			# Log is created with traceOffset == 1
-			# because a module uses a log() function for later log() calls.
-			# But creation itself is in a place not deep enough
-			# and logging of this Log creation may fail here.
-			calldepth += 1
-			try:
-				line = tb[calldepth]
-			except IndexError:
-				# impossible depth was given: sadly, we should not fail here :-(
-				# Legal Scenario: traceOffset is given a high value to adjust for standard logging
-				# another Python version theoretically can refactor the logging framework to have shorter tracebacks
-				# And the application still should not fail because of that.
-				calldepth = len(tb)-1
-				line = tb[calldepth]
-		depth = calldepth # - 1 # -1, um line nicht nochmal zu sehen
-
-		path = []
-		cfuncname = None
-		stackRest = self.stackMax
-		
-		while stackRest > 0:
-			try:
-				line = tb[depth]
-			except IndexError: break
-			else:
-				if (self._seFilesExclude is None)\
- 					or not (self._seFilesExclude(line[0])):
-					stackRest -= 1
-					path.append( (line[0],line[1]) )
-					if cfuncname is None:
-						cfuncname = line[2] # special treatment: don't add it to every path item, we want it for the first only
-				else:
-					# add a "None" line indicating an item is omitted
-					path.append( (None,None) )
-			depth -= 1
-			
-		return path,cfuncname
+		from rrlog import logging23
+		return logging23.bridge(self, extraStack=extraStack)
 
 
-	def _createServerData(self,tb,depth,message,cat,special):
+	def logging23_queued(self, **kwargs):
 		"""
-		:returns: Tuple for the log server
-		:param depth: log-internal call depth when the traceback was taken.
-		:type depth: int
+		:returns: Handler for the standard logging framework, that logs in a background thread.
+			See L{rrlog.logging23.queued}.
 		"""
-		self._msgCount += 1
-		
-		if self._msgCount == self.msgCountLimit:
-			self._msgCount = 1
-			
-		try:
-			ospid = os.getpid() # need to get it always. When saving it, a process could fork me after that.
-		except Exception as e:
-			import warnings
-			warnings.warn("log: could not obtain process id from your operating system. You'll see -1 there.")
-			ospid = -1
+		from rrlog import logging23
+		return logging23.queued(self, **kwargs)
 
-		path,cfuncname = self._getCallPath(tb,depth)
-		t = threading.currentThread()
+
+	def _getCallPath(self,frame,depth):
+		"""
+		:returns: path,cfuncname,tblen where path = ( (filename,lineno), ...), len >=0
+			cfuncname is None if no cfuncname exists (log call at module level)
+			tblen is the stack depth of the given frame, or 0 if stackDepth is off.
+			
+		:param frame: the frame of the log-internal call where the stack is taken.
+		:param depth: log-internal call depth, relative to frame.
 		
-		try:
-			tid = t.ident # >= python 2.6 only
-		except AttributeError:
-			tid = None
+			Values too high are adjusted to the outermost frame. This happens - in the following case:
+			Log is created with traceOffset == 1
+			because a module uses a log() function for later log() calls.
+			But creation itself is in a place not deep enough.
+			Also legal: traceOffset is given a high value to adjust for standard logging;
+			another Python version theoretically can refactor the logging framework to have shorter tracebacks
+			And the application still should not fail because of that.
+		:type depth: int
+		"""
+		path,cfuncname = self._callpaths.callpath(
+			stack.skip(frame,depth),
+			self.stackMax,
+			)
+		if self.stackDepth:
+			return path,cfuncname,stack.depth(frame)
+		return path,cfuncname,0
+
+
+	def _createServerData(self,path,cfuncname,tblen,message,cat,special,args=None,ident=None,ts=None):
+		"""
+		:returns: Tuple for the log server, see L{rrlog.record}
+		:param path,cfuncname,tblen: as returned by L{_getCallPath}
+		:param ident: None for the current, or (pid, tid, threadname)
+		:param ts: None for now, or a time.time() value
+		"""
+		# 1..msgCountLimit-1, then starting with 1 again
+		msgid = next(self._msgCounter)%max(self.msgCountLimit-1,1)+1
+		if ident is None:
+			ospid,tid,threadname = identity.current()
+		else:
+			ospid,tid,threadname = ident
+		if ts is None:
+			ts = now()
 			
 		return (
-			self._msgCount,
+			msgid,
 			ospid,
 			tid,
-			t.name,
-			now(),
+			threadname,
+			ts,
 			message,
 			cat,
 			path,
-			len(tb),
+			tblen,
 			cfuncname,
 			special,
+			args,
 			)
 
 
+	def _sample(self, sampler, frame, depth, cat):
+		"""
+		:returns: see L{rrlog.sampling.Sampler.__call__}
+		:param frame,depth: see L{_getCallPath}
+		"""
+		frame = stack.skip(frame,depth)
+		return sampler(frame.f_code.co_filename, frame.f_lineno, cat)
+		
+		
+	def callpath_stats(self):
+		"""
+		Tells whether the call path cache is effective.
+		Expect hits >> misses when the same log calls are repeated, e.g. in a loop.
+		
+		:returns: dict with hits, misses (call paths)
+			and excludeHits, excludeMisses (seFilesExclude verdicts per file name)
+		"""
+		return self._callpaths.stats()
+
+
+	def callpath(self, frame, stackMax=None):
+		"""
+		The call path of a log call in the given frame, for messages that are logged with L{log_at}
+		(e.g. by the standard logging bridge, see L{rrlog.logging23.bridge}).
+		Uses the call path cache and seFilesExclude of this log.
+		
+		:param frame: frame of the log call
+		:param stackMax: count of stack lines, None==the stackMax of this log
+		:returns: path,cfuncname,tblen as the L{log_at} arguments
+		"""
+		if stackMax is None:
+			stackMax = self.stackMax
+		path,cfuncname = self._callpaths.callpath(frame, stackMax)
+		if self.stackDepth:
+			return path,cfuncname,stack.depth(frame)
+		return path,cfuncname,0
+
+
+	def _endBurst(self):
+		self._burstLock.acquire()
+		try:
+			ended = self._retireBurst(None)
+		finally:
+			self._burstLock.release()
+		self._logRepeated(ended)
+		
+		
+	def flush(self):
+		"""
+		Blocks until the messages of previous log calls are written,
+		if the server is asynchronous (see L{rrlog.queueclient}).
+		Logs a pending "repeated N times" message (see collapseSecs).
+		"""
+		self._endBurst()
+		flush = getattr(self._server,"flush",None)
+		if flush is not None:
+			flush()
+
+
+	def close(self):
+		"""
+		Flushes and closes the server, if the server supports that.
+		"""
+		self._endBurst()
+		close = getattr(self._server,"close",None)
+		if close is not None:
+			close()
+
+
+	def _getCatsEnable(self):
+		return self._catsEnable
+	
+	def _setCatsEnable(self, cats):
+		if cats is not None:
+			cats = frozenset(cats)
+		self._catsEnable = cats
+		self._refreshCatLogs()
+		
+	catsEnable = property(_getCatsEnable, _setCatsEnable, doc="None, or frozenset of the enabled cats. Can be assigned any iterable of cats.")
+	
+	
+	def _getCatsDisable(self):
+		return self._catsDisable
+	
+	def _setCatsDisable(self, cats):
+		if cats is not None:
+			cats = frozenset(cats)
+		self._catsDisable = cats
+		self._refreshCatLogs()
+		
+	catsDisable = property(_getCatsDisable, _setCatsDisable, doc="None, or frozenset of the disabled cats. Can be assigned any iterable of cats.")
+
+
+	def enabled(self, cat=""):
+		"""
+		Intended to skip expensive preparation of log messages that won't be logged anyway.
+		
+		:returns: True if a log call with that cat would be logged (considering on/off, catsEnable and catsDisable)
+		"""
+		if not self._on:
+			return False
+		elif (self._catsEnable is not None) and (cat not in self._catsEnable):
+			return False
+		elif (self._catsDisable is not None) and (cat in self._catsDisable):
+			return False
+		return True
+
+
+	def for_cat(self, cat):
+		"""
+		A log bound to a category, for calls in hot loops:
+		When the category is disabled, calling it does nothing but a single attribute check.
+		It also evaluates to False then, so even the message preparation can be skipped::
+		
+			debug = log.for_cat("D")
+			...
+			debug("x=%s", args=(x,))
+			if debug: debug(expensive())
+			
+		The bound log follows later changes of catsEnable, catsDisable and on/off.
+		
+		:returns: callable, takes the same arguments as the log except cat.
+			The same object is returned for each call with the same cat.
+		"""
+		try:
+			return self._catLogs[cat]
+		except KeyError:
+			res = _CatLog(self, cat)
+			res.enabled = self.enabled(cat)
+			self._catLogs[cat] = res
+			return res
+
+
+	def _refreshCatLogs(self):
+		for cat,catlog in list(self._catLogs.items()):
+			catlog.enabled = self.enabled(cat)
+
+
 	def on(self):
 		self._on = True
+		self._refreshCatLogs()
 		
 		
 	def off(self):		
 		self._on = False
+		self._refreshCatLogs()
 
 
 	def set_sticked_items(self, asdict):
@@ -306,14 +526,32 @@ class Log(object):
 			Example: {"ip":requests_ip_address}
 			
 			Call with {} to end sticking data.
+			
+		These items apply to all threads and tasks. For items of a request (thread, asyncio task), use L{sticked}.
 		"""
 		assert hasattr(asdict,"__getitem__"), "need dictlike object, got %s"%(type(asdict))
-		self._sticked_items = asdict
+		self._sticked_items = asdict # a single assignment: other threads see either the old or the new items
+
+
+	def sticked(self, asdict):
+		"""
+		Context manager: The items are appended to the log calls within the with-block,
+		in the current thread or asyncio task only (see contextvars). Blocks can be nested, inner items override outer ones.
+		Example::
+		
+			with log.sticked({"request":request_id}):
+				handle(request)
+		
+		These items override the items of L{set_sticked_items}; the special dict of a log call overrides them.
+		The dict is not copied, don't modify it while in use.
+		"""
+		assert hasattr(asdict,"__getitem__"), "need dictlike object, got %s"%(type(asdict))
+		return _Sticked(self._stickedCtx, asdict)
 		
 
-	def __call__(self, message, cat="", special=None, traceDepth=1, **kwargs):
+	def __call__(self, message, cat="", special=None, traceDepth=1, args=None, **kwargs):
 		"""
-		:param message: String to be logged
+		:param message: String to be logged. With args, this is a template like "x=%s".
 		:param cat: application specific category, e.g. "E"=Error,"W"=Warning. Default is "".
 			
 		:param special: dict-like object (only the items() -> (k,v)-iter method is required)
@@ -327,47 +565,276 @@ class Log(object):
 				Default=1. Typically, you may increase that if you call the log with a wrapping function which should be hidden in the stacktrace.
 				This adjusts the current call only. See traceOffset in L{__init__} for a permanent adjustment.
 				
+		:param args: None, or a sequence of values that are merged into the message (message%args) when the message is written.
+				Example: log("x=%s, y=%s", args=(x,y))
+				Formatting is done by the log server, and only if the message is really written.
+				For remote logging, the args should be basic datatypes (str, numbers...);
+				otherwise the message is formatted before it is sent.
+				A sequence with a single dict is used as mapping, e.g. log("%(x)s", args=({"x":1},))
+		:type args: tuple or None
+				
 		:param Kwargs:
 			**Deprecated**  Use the "special" dict only.
 			You can provide any custom kwargs you like. This is sugar for convenience,
 			all kwargs are put into the "special" dict.
 			kwargs items override both items of special dict and sticked items silently.
+			When sticked items exist (see L{sticked}), the special dict in the log server may be a ChainMap instead of a dict.
 			
 		:returns: log-client specific message number,starting with 1 (not unique at server side, if multiple log clients are used.) 
 		"""
-		if (self.catsEnable is not None) and (cat not in self.catsEnable):
+		if (self._catsEnable is not None) and (cat not in self._catsEnable):
 			return
-		elif (self.catsDisable is not None) and (cat in self.catsDisable):
+		elif (self._catsDisable is not None) and (cat in self._catsDisable):
 			return
 		
 		if not self._on:
 			return
 
-		if self._sticked_items:
-			# add these items into special
-			if special is None: special = kwargs
-			else: special.update(kwargs)
+		sampler = self.sampler
+		if sampler is not None:
+			suppressed = self._sample(sampler, stack.getframe(), traceDepth+self.traceOffset, cat)
+			if suppressed is None:
+				return
+		else:
+			suppressed = 0
 			
+		if self.collapseSecs is not None:
+			burst = self._collapse(stack.getframe(), traceDepth+self.traceOffset, message, cat, args)
+			if burst is None:
+				return # a repetition
+		else:
+			burst = None
+		
 		if kwargs:
+			import warnings # Python 2.7 hides DeprecationWarning. Use python -Wd
 			warnings.warn("custom kwargs in the log call are deprecated. Use the 'special (dict)' parameter", DeprecationWarning)
-			# add these items into special
-			if special is None:
-				special = kwargs
-			else:
-				special.update(kwargs)
+		special = self._mergeSpecial(special, kwargs, suppressed)
 		
+		instruments = self.instruments
+		if instruments is not None:
+			t0 = instrument.clock()
 		if self._extractStack:
-			tb = traceback.extract_stack()
+			# no frame is bound to a local here (that would make a reference cycle)
+			path,cfuncname,tblen = self._getCallPath(
+				stack.getframe(),
+				traceDepth+self.traceOffset,
+				)
 		else:
-			tb = ()
+			path,cfuncname,tblen = (),"",0
+		if instruments is not None:
+			t1 = instrument.clock()
+			instruments.add(instrument.STACK, t1-t0)
 		sd = self._createServerData(
-			tb,
-			traceDepth+self.traceOffset,
+			path,
+			cfuncname,
+			tblen,
 			message,
 			cat,
 			special,
+			args,
 			)
+		if instruments is not None:
+			instruments.add(instrument.BUILD, instrument.clock()-t1)
 		
+		if burst is not None:
+			self._burstLock.acquire()
+			try:
+				burst.sd = sd
+				ended = burst.ended
+			finally:
+				self._burstLock.release()
+			res = self._send(sd)
+			if ended: # another call ended the burst while I built the data
+				self._logRepeated(burst)
+			return res
+		return self._send(sd)
+
+
+	def many(self, messages, cat="", special=None, traceDepth=1):
+		"""
+		Logs several messages with one call, e.g. the lines of a bulk operation.
+		Call path, thread and special items are determined once for all messages,
+		and the server gets all of them at once (if it has a log_batch method, like L{rrlog.server.LogServer.log_batch}).
+		Remote servers get them with a single request.
+		
+		Not affected by collapseSecs. With a sampler, the many-call counts as a single log call.
+		
+		:param messages: sequence of messages. Each is a str, or a tuple (template, args) as the message and args of L{__call__}.
+		:param cat,special,traceDepth: as for L{__call__}, valid for all the messages
+		:returns: list of the msgids, or None
+		"""
+		if (self._catsEnable is not None) and (cat not in self._catsEnable):
+			return
+		elif (self._catsDisable is not None) and (cat in self._catsDisable):
+			return
+		
+		if not self._on:
+			return
+
+		sampler = self.sampler
+		if sampler is not None:
+			suppressed = self._sample(sampler, stack.getframe(), traceDepth+self.traceOffset, cat)
+			if suppressed is None:
+				return
+		else:
+			suppressed = 0
+		
+		if self._burst is not None:
+			self._endBurst() # keep the order
+			
+		special = self._mergeSpecial(special, {}, suppressed)
+		
+		instruments = self.instruments
+		if instruments is not None:
+			t0 = instrument.clock()
+		if self._extractStack:
+			path,cfuncname,tblen = self._getCallPath(
+				stack.getframe(),
+				traceDepth+self.traceOffset,
+				)
+		else:
+			path,cfuncname,tblen = (),"",0
+		if instruments is not None:
+			t1 = instrument.clock()
+			instruments.add(instrument.STACK, t1-t0)
+		
+		sds = []
+		for message in messages:
+			if type(message) is tuple:
+				message,args = message
+			else:
+				args = None
+			sds.append(
+				self._createServerData(path, cfuncname, tblen, message, cat, special, args)
+				)
+		if instruments is not None:
+			instruments.add(instrument.BUILD, instrument.clock()-t1) # one measure for the batch
+		return self._sendBatch(sds)
+
+
+	def _sendBatch(self, sds):
+		"""
+		:returns: list of msgids, None if failed
+		"""
+		if not sds:
+			return []
+		log_batch = getattr(self._server,"log_batch",None)
+		try:
+			if log_batch is not None:
+				log_batch(sds)
+			else:
+				for sd in sds:
+					self._server.log(sd)
+		except Exception as e:
+			if self._errorHandler is not None:
+				self._errorHandler.handleException(e)
+			else:
+				raise
+		else:
+			return [sd[record.MSGID] for sd in sds]
+
+
+	def log_at(self, message, cat, path, cfuncname, tblen=0, special=None, args=None, ident=None, ts=None):
+		"""
+		Logs with a call path that is already known, without stack extraction.
+		Used to take over records of other log systems (see L{rrlog.logging23.bridge}).
+		Category, on/off, sampler and sticked items apply as with L{__call__}, collapseSecs doesn't.
+		
+		:param message,cat,special,args: see L{__call__}
+		:param path: sequence of (filename, linenumber), [0] is where the log call happened
+		:param cfuncname: name of the function of the log call
+		:param tblen: stack depth of the log call, or 0 if unknown
+		:param ident: None for the current, or (pid, tid, threadname)
+		:param ts: None for now, or the time.time() of the log call
+		:returns: msgid, or None
+		"""
+		if self._burst is not None:
+			self._endBurst() # keep the order
+		sd = self._atData(message, cat, path, cfuncname, tblen, special, args, ident, ts)
+		if sd is not None:
+			return self._send(sd)
+
+
+	def log_at_batch(self, items):
+		"""
+		Like L{log_at} for many messages, the server gets them at once (see L{many}).
+		:param items: sequence of tuples, each with the L{log_at} arguments
+		:returns: list of the msgids of the messages logged, or None
+		"""
+		if self._burst is not None:
+			self._endBurst() # keep the order
+		sds = []
+		for item in items:
+			sd = self._atData(*item)
+			if sd is not None:
+				sds.append(sd)
+		return self._sendBatch(sds)
+
+
+	def _atData(self, message, cat, path, cfuncname, tblen=0, special=None, args=None, ident=None, ts=None):
+		"""
+		:returns: the record for L{log_at}, None if not to log
+		"""
+		if (self._catsEnable is not None) and (cat not in self._catsEnable):
+			return
+		elif (self._catsDisable is not None) and (cat in self._catsDisable):
+			return
+		
+		if not self._on:
+			return
+
+		sampler = self.sampler
+		if (sampler is not None) and path:
+			suppressed = sampler(path[0][0], path[0][1], cat)
+			if suppressed is None:
+				return
+		else:
+			suppressed = 0
+			
+		return self._createServerData(
+			path,
+			cfuncname,
+			tblen,
+			message,
+			cat,
+			self._mergeSpecial(special, {}, suppressed),
+			args,
+			ident,
+			ts,
+			)
+
+
+	def _mergeSpecial(self, special, kwargs, suppressed):
+		"""
+		:returns: the special items of a log call, with the sticked items
+		"""
+		sticked = self._sticked_items # read once, another thread may replace it
+		ctxItems = self._stickedCtx.get()
+		
+		if sticked or kwargs or suppressed:
+			# merge into a new dict. Neither the callers special dict nor the sticked items are modified.
+			merged = dict(sticked)
+			if ctxItems is not None:
+				merged.update(ctxItems)
+			if special is not None:
+				merged.update(special.items())
+			merged.update(kwargs)
+			if suppressed:
+				merged[sampling.SPECIAL_KEY] = suppressed
+			special = merged
+		elif ctxItems is not None:
+			# no copy, the ChainMap looks into the dicts
+			if special is None:
+				special = ctxItems
+			else:
+				special = ctxItems.new_child(special)
+		return special
+
+
+	def _send(self, sd):
+		"""
+		:returns: msgid, None if failed
+		"""
 		try:
 			self._server.log(sd)
 		except Exception as e:
@@ -376,7 +843,79 @@ class Log(object):
 			else:
 				raise # Exception(str(e)+traceToShortStr())
 		else:
-			return sd[0]
+			return sd[record.MSGID]
+
+
+	def _collapse(self, frame, depth, message, cat, args):
+		"""
+		Maintains the current burst of repeated messages (for collapseSecs).
+		
+		:returns: None if the message is a repetition (don't log it),
+			otherwise a new _Burst which needs the logged data.
+		"""
+		frame = stack.skip(frame,depth)
+		key = (frame.f_code.co_filename, frame.f_lineno, message, cat, args)
+		try:
+			hash(key)
+		except TypeError: # args with a list or so
+			key = key[:4]+(repr(args),)
+		t = now()
+		
+		self._burstLock.acquire()
+		try:
+			current = self._burst
+			if (current is not None) and (current.key == key) and (t-current.t <= self.collapseSecs):
+				current.count += 1
+				return None
+			res = _Burst(key,t)
+			ended = self._retireBurst(res)
+		finally:
+			self._burstLock.release()
+			
+		if not self._burstAtExit:
+			self._burstAtExit = True
+			_endBurstAtExit(self)
+		self._logRepeated(ended)
+		return res
+
+
+	def _retireBurst(self, burst):
+		"""
+		Replaces the current burst. Call with the _burstLock held.
+		:returns: the ended burst, or None if there is none or its log call has not yet built the data
+			(that call logs the repetitions then)
+		"""
+		ended = self._burst
+		self._burst = burst
+		if ended is not None:
+			ended.ended = True
+			if ended.sd is None:
+				return None
+		return ended
+
+
+	def _logRepeated(self, burst):
+		"""
+		Logs the "repeated N times" message, if the burst had repetitions.
+		"""
+		if (burst is None) or (burst.count == 0) or (burst.sd is None):
+			return
+		sd = burst.sd
+		special = {}
+		if sd[record.SPECIAL] is not None:
+			special.update(sd[record.SPECIAL].items())
+		special["repeated"] = burst.count
+		self._send(
+			self._createServerData(
+				sd[record.PATH],
+				sd[record.CFUNC],
+				sd[record.TBLEN],
+				"%s [repeated %d times]"%(sd[record.MSG],burst.count),
+				sd[record.CAT],
+				special,
+				sd[record.ARGS],
+				)
+			)
 
 
 	def __repr__(self):
@@ -384,3 +923,73 @@ class Log(object):
 			return {True:"on",False:"Off"}[self._on]
 		
 		return "%s(%s)"%(self.name,on())
+
+
+
+class _CatLog(object):
+	"""
+	A log call with a fixed category, see L{Log.for_cat}
+	@ivar enabled: False if calls are ignored. Maintained by the Log.
+	"""
+	__slots__ = ("_log","cat","enabled")
+	
+	def __init__(self, log, cat):
+		self._log = log
+		self.cat = cat
+		self.enabled = True
+
+
+	def __call__(self, message, special=None, traceDepth=1, args=None, **kwargs):
+		"""
+		See L{Log.__call__}
+		"""
+		if self.enabled:
+			return self._log(message, self.cat, special, traceDepth+1, args, **kwargs)
+			
+			
+	def __bool__(self):
+		return self.enabled
+	__nonzero__ = __bool__ # Python 2
+	
+	
+	def __repr__(self):
+		return "%s[%s]"%(self._log,self.cat)
+
+
+
+class _Burst(object):
+	"""
+	A logged message and the count of its collapsed repetitions, see collapseSecs of L{Log.__init__}
+	"""
+	__slots__ = ("key","t","count","sd","ended")
+	
+	def __init__(self, key, t):
+		self.key = key
+		self.t = t
+		self.count = 0
+		self.sd = None # set by the log call when its data is built
+		self.ended = False
+
+
+
+class _Sticked(object):
+	"""
+	Context manager of L{Log.sticked}
+	"""
+	__slots__ = ("_var","_asdict","_token")
+	
+	def __init__(self, var, asdict):
+		self._var = var
+		self._asdict = asdict
+		
+	def __enter__(self):
+		outer = self._var.get()
+		if outer is None:
+			items = ChainMap(self._asdict)
+		else:
+			items = outer.new_child(self._asdict)
+		self._token = self._var.set(items)
+		return items
+		
+	def __exit__(self, *exc_info):
+		self._var.reset(self._token)
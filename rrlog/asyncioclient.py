@@ -0,0 +1,343 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+"""
+@summary:
+Remote logging from asyncio applications, to the socket server (L{rrlog.server.socketserver}).
+The log call remains synchronous and never blocks the event loop:
+the message is written to an asyncio transport. While the transport is paused
+(the socket doesn't take data fast enough) or not yet connected, messages are kept in a bounded buffer.
+
+Usage::
+
+	log = rrlog.asyncioclient.createClientLog()
+	...
+	log("hello") # in the event loop thread, or any other thread
+	...
+	await log.aclose() # sends what is buffered
+
+@author: Ruben Reifenberg
+"""
+
+import asyncio
+import collections
+
+import rrlog
+from rrlog import globalconst
+from rrlog import instrument
+from rrlog.globalconst import warn
+from rrlog.socketclient import makeFrame
+
+
+def _running_loop():
+	try:
+		return asyncio.get_running_loop()
+	except RuntimeError:
+		return None
+
+
+class _Protocol(asyncio.Protocol):
+	
+	def __init__(self, proxy):
+		self._proxy = proxy
+		
+	def connection_made(self, transport):
+		self._proxy._connected(transport)
+		
+	def connection_lost(self, exc):
+		self._proxy._lost(exc)
+		
+	def pause_writing(self):
+		self._proxy._paused = True
+		
+	def resume_writing(self):
+		self._proxy._paused = False
+		self._proxy._writePending()
+
+
+
+class MessagesDiscarded(Exception):
+	"""
+	Given to the errorHandler of L{AsyncLogServerProxy}, when close() discards buffered messages.
+	"""
+	pass
+
+
+
+class AsyncLogServerProxy(object):
+	"""
+	Counterpart of L{rrlog.socketclient.LogServerProxy} for asyncio.
+	All socket work happens in the event loop; log calls from other threads are handed over to the loop.
+	
+	@ivar dropped: count of messages dropped because the buffer was full, or discarded by L{close}
+	@ivar maxBuffer: see L{__init__}
+	"""
+	
+	def __init__(self, host="localhost", port=globalconst.DEFAULTPORT_SOCKET, loop=None, maxBuffer=10000, retrySecs=1., instruments=None, errorHandler="stderr"):
+		"""
+		:param loop: the event loop to use. None to use the loop which runs the first log call.
+		:param maxBuffer: count of messages kept while the server is not connected or the transport is paused.
+		
+			When exceeded, the oldest messages are dropped.
+			
+		:param retrySecs: wait time until the next connect attempt, after a connect failed.
+		:param instruments: None, or L{rrlog.instrument.Instruments} to measure the serialization
+		:param errorHandler: Receives a L{MessagesDiscarded} when L{close} discards buffered messages.
+			Same meaning as for L{rrlog.Log.__init__}, but None is not allowed, default is "stderr".
+		"""
+		assert maxBuffer > 0
+		assert errorHandler is not None, "need an errorHandler, close() can't raise for the discarded messages"
+		if str(errorHandler).lower()=="stderr": errorHandler=rrlog.StderrErrorHandler()
+		elif str(errorHandler).lower()=="stdout": errorHandler=rrlog.StdoutErrorHandler()
+		elif str(errorHandler).lower()=="silent": errorHandler=rrlog.SilentErrorHandler()
+		elif isinstance(errorHandler,str): raise TypeError("probably mistyped str value for errorHandler:%s"%(errorHandler))
+		self._errorHandler = errorHandler
+		self.host = host
+		self.port = port
+		self.maxBuffer = maxBuffer
+		self.retrySecs = retrySecs
+		self.dropped = 0
+		self.instruments = instruments
+		self._loop = loop
+		self._transport = None
+		self._paused = False
+		self._connecting = False
+		self._closed = False
+		self._warned = False
+		self._pending = collections.deque() # frames
+		
+		
+	def addClient(self):
+		"""
+		"""
+		return 0
+
+
+	def log(self, logdata):
+		self._put(self._frame(rrlog.portable_jobdata(logdata)))
+
+
+	def log_batch(self, logdatas):
+		"""
+		Sends the batch as a single frame.
+		"""
+		self._put(self._frame({"batch":[rrlog.portable_jobdata(x) for x in logdatas]}))
+
+
+	def _frame(self, obj):
+		instruments = self.instruments
+		if instruments is None:
+			return makeFrame(obj)
+		t0 = instrument.clock()
+		res = makeFrame(obj)
+		instruments.add(instrument.SERIALIZE, instrument.clock()-t0)
+		return res
+
+
+	def _put(self, frame):
+		running = _running_loop()
+		if self._loop is None:
+			self._loop = running
+		if running is self._loop:
+			self._send(frame)
+		elif self._loop is None: # no loop known yet, wait for one
+			self._buffer(frame)
+		else:
+			self._loop.call_soon_threadsafe(self._send, frame)
+
+
+	def _send(self, frame):
+		"""
+		In the event loop only.
+		"""
+		if (self._transport is not None) and not self._paused and not self._pending:
+			self._transport.write(frame)
+		else:
+			self._buffer(frame)
+			if self._transport is None:
+				self._connect()
+			else:
+				self._writePending()
+
+
+	def _buffer(self, frame):
+		if len(self._pending) >= self.maxBuffer:
+			self._pending.popleft()
+			self.dropped += 1
+		self._pending.append(frame)
+
+
+	def _writePending(self):
+		"""
+		Moves buffered frames into the transport, until it pauses.
+		"""
+		while self._pending and (self._transport is not None) and not self._paused:
+			self._transport.write(self._pending.popleft())
+
+
+	def _connect(self):
+		if self._connecting or self._closed:
+			return
+		self._connecting = True
+		self._loop.create_task(self._open())
+
+
+	async def _open(self):
+		try:
+			await self._loop.create_connection(lambda: _Protocol(self), self.host, self.port)
+		except OSError as e:
+			if not self._warned:
+				warn("""! Loosing Log Messages ! Currently, no rrlog server is found at %s:%s (%s).
+					Log messages are buffered (max. %s) and the connection is retried."""%(self.host, self.port, e, self.maxBuffer))
+				self._warned = True
+			self._loop.call_later(self.retrySecs, self._retry)
+		finally:
+			self._connecting = False
+
+
+	def _retry(self):
+		if self._pending and (self._transport is None):
+			self._connect()
+
+
+	def _connected(self, transport):
+		if self._closed:
+			transport.close()
+			return
+		self._transport = transport
+		self._paused = False
+		self._warned = False
+		self._writePending()
+
+
+	def _lost(self, exc):
+		self._transport = None
+		self._paused = False
+		if self._pending:
+			self._connect()
+
+
+	def pending(self):
+		"""
+		:returns: count of buffered messages, not yet given to the transport
+		"""
+		return len(self._pending)
+
+
+	def _unsent(self):
+		"""
+		:returns: True if the buffer or the transport still has data
+		"""
+		if self._pending:
+			return True
+		return (self._transport is not None) and (self._transport.get_write_buffer_size() > 0)
+
+
+	async def drain(self, timeout=None, interval=.01):
+		"""
+		Waits until the buffered messages are sent (or the timeout is over).
+		Requires a connected server.
+		:returns: True if all is sent
+		"""
+		if self._loop is None:
+			self._loop = asyncio.get_running_loop()
+		if self._pending and (self._transport is None):
+			self._connect()
+		t_end = None if timeout is None else self._loop.time()+timeout
+		while self._unsent():
+			if (t_end is not None) and (self._loop.time() >= t_end):
+				return False
+			await asyncio.sleep(interval)
+		return True
+
+
+	def close(self):
+		"""
+		Closes the connection, the transport still sends what it has.
+		Buffered messages are discarded (counted as dropped, and reported to the errorHandler), see L{aclose}.
+		"""
+		self._closed = True
+		discarded = len(self._pending)
+		self._pending.clear()
+		if discarded:
+			self.dropped += discarded
+			self._errorHandler.handleException(
+				MessagesDiscarded("%d buffered log messages discarded by close(), not sent to %s:%s"%(discarded, self.host, self.port))
+				)
+		if self._transport is not None:
+			self._transport.close()
+
+
+	async def aclose(self, timeout=5.):
+		"""
+		Sends the buffered messages, then closes.
+		"""
+		await self.drain(timeout)
+		self.close()
+
+
+
+class AsyncLog(rrlog.Log):
+	"""
+	Log with awaitable flush and close, for a server like L{AsyncLogServerProxy}.
+	The log call itself is the same as with L{rrlog.Log}.
+	"""
+	
+	async def drain(self, timeout=None):
+		"""
+		Like L{flush}, but without blocking the event loop.
+		:returns: True if all is sent
+		"""
+		self._endBurst()
+		drain = getattr(self._server,"drain",None)
+		if drain is None:
+			return True
+		return await drain(timeout)
+
+
+	async def aclose(self, timeout=5.):
+		"""
+		Like L{close}, but without blocking the event loop. Sends the buffered messages first.
+		"""
+		self._endBurst()
+		aclose = getattr(self._server,"aclose",None)
+		if aclose is not None:
+			await aclose(timeout)
+		else:
+			self.close()
+
+
+
+def createClientLog(host="localhost", port=globalconst.DEFAULTPORT_SOCKET, errorHandler=None, traceOffset=0, stackMax=5, extractStack=True, seFilesExclude=None, maxBuffer=10000, instruments=None):
+	"""
+	:param instruments: see L{rrlog.instrument}, used by the Log and the server proxy
+	:returns: AsyncLog instance
+	"""
+	return AsyncLog(
+		server = AsyncLogServerProxy(host, port, maxBuffer=maxBuffer, instruments=instruments),
+		instruments=instruments,
+		traceOffset=traceOffset,
+		stackMax = stackMax,
+		errorHandler=errorHandler,
+		seFilesExclude=seFilesExclude,
+		extractStack=extractStack,
+	)
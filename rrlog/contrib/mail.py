@@ -135,6 +135,14 @@ class CatRule(object):
 		self._max_delay_secs = max_delay_secs
 		
 		
+	@property
+	def cats(self):
+		"""
+		The cats to catch, None == any
+		"""
+		return self._cats
+		
+		
 	def max_delay_secs(self, cat):
 		"""
 		:returns: Max.remaining buffering time for that job. None if rule does not apply.
@@ -222,10 +230,24 @@ class CatBuffer(object):
 		self._format_line = (format_line,)
 		self._lines = []
 		self._rules = rules		
+		self.cats = self._ruleCats(rules) # the LogServer calls me for these cats only
 		self._deadline = None
 		self._rlock = RLock()
 		
 		
+	def _ruleCats(self, rules):
+		"""
+		:returns: frozenset of the cats that the rules catch, None if a rule catches any cat
+		"""
+		cats = set()
+		for rule in rules:
+			ruleCats = getattr(rule, "cats", None)
+			if ruleCats is None:
+				return None
+			cats.update(ruleCats)
+		return frozenset(cats)
+
+
 	def _calc_deadline(self, secs_remaining):
 		return now() + timedelta(seconds=secs_remaining)
 	
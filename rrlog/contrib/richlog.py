@@ -66,15 +66,15 @@ class RichLog1(object):
 		Can use the current trace, of the trace of the last exception.
 		:param use_ex: If False, I use the current stacktrace. If True, I use the existing sys.exc_info().
 		"""
-		self.wrapped("%s,trace:"%(message))
 		if use_ex:
 			type,value,exc_trace = sys.exc_info()
 			trace=traceback.extract_tb(exc_trace)
 		else:
 			trace = traceback.extract_stack()
 		lines = traceback.format_list(trace)
-		for i,line in enumerate(lines):
-			self.wrapped("[%s] %s"%(i,line))
+		self.wrapped.many(
+			["%s,trace:"%(message)]+["[%s] %s"%(i,line) for i,line in enumerate(lines)]
+			)
 
 
 	def dict(self, aDict, message=""):
@@ -82,6 +82,6 @@ class RichLog1(object):
 		logs a dict, each item as a single log msg
 		:param message: Optional log message e.g. to identify the dict
 		"""
-		self.wrapped("%s,dict:"%(message))
-		for i,(k,v) in enumerate(list(aDict.items())):
-			self.wrapped("[%s] %s:%s"%(i,k,v))
+		self.wrapped.many(
+			["%s,dict:"%(message)]+["[%s] %s:%s"%(i,k,v) for i,(k,v) in enumerate(list(aDict.items()))]
+			)
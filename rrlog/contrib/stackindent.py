@@ -48,17 +48,21 @@ class StackIndentFilter(object):
 	Use -1 to immediately indent by 1 token etc.
 	(Negative indention is ignored, such lines appear with indent zero.)
 	"""
-	def __init__(self, token=" ",msgPrefix=None):
+	def __init__(self, token=" ",msgPrefix=None, cats=None):
 		"""
 		:param token: The string used to indent one level.
 		:param msgPrefix: str. If given, indent only messages 
 		
 			starting with this prefix.
 			All other messages are ignored (they cannot even trigger a "tara").
+			
+		:param cats: If given, indent only messages of these categories (like msgPrefix).
+			The LogServer doesn't call the filter for other categories.
 		"""
 		self._si = StrIndenter(token=token)
 		self._dotara = True
 		self.msgPrefix = msgPrefix
+		self.cats = cats
 		
 
 	def __call__(self, jobhist, writer):
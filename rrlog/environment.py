@@ -21,31 +21,41 @@
 """
 constants about the environment (SQLAlchemy) available
 Purpose: provide compatibility with a wide SQLAlchemy version range
+SQLAlchemy is imported at the first access of a constant, not with this module.
 @author: Ruben Reifenberg
 """
 
-try:
-	import sqlalchemy
-	sa_available = True
-except:
-	sa_available = False
+_SA_NAMES = ("sqlalchemy","sa_available","sa_v0_3_x","sa_lt_v0_6_0")
 
-if sa_available:
+
+def _detect():
 	try:
-		v = sqlalchemy.__version__
-	except AttributeError:
-		# older 0.3.x has no __version__ attribute
-		# assume old 0.3.x. Not prepared for 0.2.x and older.
-		v = "0.3.x"
+		import sqlalchemy
+		sa_available = True
+	except:
+		sa_available = False
+	res = {"sa_available":sa_available}
+
+	if sa_available:
+		res["sqlalchemy"] = sqlalchemy
+		try:
+			v = sqlalchemy.__version__
+		except AttributeError:
+			# older 0.3.x has no __version__ attribute
+			# assume old 0.3.x. Not prepared for 0.2.x and older.
+			v = "0.3.x"
 
-	if v.startswith("0.3."):
 		# SA exactly 0.3.x
-		sa_v0_3_x = True
-	else:
-		sa_v0_3_x = False
+		res["sa_v0_3_x"] = v.startswith("0.3.")
 
-	if v.startswith("0.3.") or v.startswith("0.4.") or v.startswith("0.5."):
 		# SA lower than 0.6.0
-		sa_lt_v0_6_0 = True
-	else:
-		sa_lt_v0_6_0 = False
+		res["sa_lt_v0_6_0"] = v.startswith("0.3.") or v.startswith("0.4.") or v.startswith("0.5.")
+	return res
+
+
+def __getattr__(name):
+	if name in _SA_NAMES:
+		globals().update(_detect())
+		if name in globals():
+			return globals()[name]
+	raise AttributeError("module %r has no attribute %r"%(__name__, name))
@@ -19,7 +19,9 @@
 # THE SOFTWARE.
 
 
-from warnings import warn # override for different warn target
+def warn(message, category=None, stacklevel=1): # override for different warn target
+	import warnings # imported at first use, for a fast "import rrlog"
+	warnings.warn(message, category, stacklevel+1)
 
 
 
@@ -30,21 +32,28 @@ class EnvironmentError(Exception):
 	pass
 
 
-try:
-	import simplejson as json # currently, simplejson seems faster.
-except ImportError:
-	import json
-
-
-# these values should work as alternative to json.dumps:
-# marshal.dumps
-# lambda x: pickle.dumps(x,1)
-remotedumps = json.dumps
-
-# these values must correspond with the above ones:
-# marshal.loads
-# pickle.loads
-remoteloads = json.loads
+def __getattr__(name):
+	"""
+	remotedumps and remoteloads are json by default, imported at first use (remote logging only).
+	Assign other values before the socket client or server is imported.
+	"""
+	if name in ("remotedumps","remoteloads"):
+		try:
+			import simplejson as json # currently, simplejson seems faster.
+		except ImportError:
+			import json
+		
+		# these values should work as alternative to json.dumps:
+		# marshal.dumps
+		# lambda x: pickle.dumps(x,1)
+		globals().setdefault("remotedumps", json.dumps)
+		
+		# these values must correspond with the above ones:
+		# marshal.loads
+		# pickle.loads
+		globals().setdefault("remoteloads", json.loads)
+		return globals()[name]
+	raise AttributeError("module %r has no attribute %r"%(__name__, name))
 
 # Remarks:
 # marshal is fast but may require both sides to run with same Python version; security is unknown.
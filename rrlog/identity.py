@@ -0,0 +1,89 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+@summary: Cached identification of the logging process and thread,
+as required for each log message.
+The process id is refreshed when the process forks (Python >= 3.7, otherwise it is obtained with each call).
+The thread id and name are kept per thread, and refreshed when the thread is renamed.
+@author: Ruben Reifenberg
+"""
+
+import os
+import threading
+
+
+def _obtain_pid():
+	try:
+		return os.getpid()
+	except Exception:
+		import warnings
+		warnings.warn("log: could not obtain process id from your operating system. You'll see -1 there.")
+		return -1
+
+
+_generation = 0 # incremented in each forked child, invalidates the thread data
+
+
+if hasattr(os,"register_at_fork"):
+	_pid = _obtain_pid()
+	
+	def _after_fork():
+		global _pid
+		global _generation
+		_pid = _obtain_pid()
+		_generation += 1
+		
+	os.register_at_fork(after_in_child=_after_fork)
+	
+	def pid():
+		"""
+		:returns: process id, -1 if not available
+		"""
+		return _pid
+else:
+	pid = _obtain_pid # no fork notification available: need to get it always
+
+
+class _ThreadData(threading.local):
+	generation = -1
+	thread = None
+	tid = None
+	name = None
+
+_threaddata = _ThreadData()
+
+
+def current():
+	"""
+	:returns: (pid,tid,threadname) of the calling thread
+	"""
+	data = _threaddata
+	thread = data.thread
+	
+	if (thread is None) or (data.generation != _generation) or (thread.name is not data.name):
+		thread = threading.current_thread()
+		data.thread = thread
+		data.tid = thread.ident
+		data.name = thread.name
+		data.generation = _generation
+		
+	return pid(),data.tid,data.name
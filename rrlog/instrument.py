@@ -0,0 +1,174 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+"""
+@summary:
+Opt-in latency measurement of the logging pipeline stages.
+Give an Instruments object to the parts you want to measure, e.g.::
+
+	instruments = Instruments()
+	server = LogServer(writer, instruments=instruments)
+	log = Log(server, instruments=instruments)
+	...
+	print(instruments.stats())
+
+Each stage gets a histogram of its durations (nanoseconds, power-of-two buckets).
+Without instruments (the default), the pipeline does no time measurement at all.
+
+@var STACK: client: call path extraction (L{rrlog.Log})
+@var BUILD: client: building the record (L{rrlog.Log})
+@var SERIALIZE: client: json/pickle of remote clients
+@var ENQUEUE: the log call of a queue (L{rrlog.queueclient}), including waiting for free space
+@var DEQUEUE: time in a queue (L{rrlog.queueclient}: since the record was built, socket server: since the record was received)
+@var DESERIALIZE: server: json/pickle of remote servers
+@var FILTERS, WRITE, OBSERVERS: server: the filters, the writer.writeNow, the observers (L{rrlog.server.LogServer})
+@author: Ruben Reifenberg
+"""
+
+import threading
+import time
+
+clock = time.perf_counter_ns
+
+STACK = "stack"
+BUILD = "build"
+SERIALIZE = "serialize"
+ENQUEUE = "enqueue"
+DEQUEUE = "dequeue"
+DESERIALIZE = "deserialize"
+FILTERS = "filters"
+WRITE = "write"
+OBSERVERS = "observers"
+
+STAGES = (STACK, BUILD, SERIALIZE, ENQUEUE, DEQUEUE, DESERIALIZE, FILTERS, WRITE, OBSERVERS)
+
+
+class Histogram(object):
+	"""
+	Durations in nanoseconds. Bucket i counts the durations d with 2**(i-1) <= d < 2**i (bucket 0: d==0)
+	Not thread safe, see L{Instruments}.
+	"""
+	__slots__ = ("buckets","count","total","min","max")
+	
+	def __init__(self):
+		self.buckets = [0]*65
+		self.count = 0
+		self.total = 0
+		self.min = None
+		self.max = 0
+
+
+	def add(self, ns):
+		if ns < 0:
+			ns = 0 # clock differences of machines, see DEQUEUE
+		self.buckets[min(ns.bit_length(),64)] += 1
+		self.count += 1
+		self.total += ns
+		if (self.min is None) or (ns < self.min):
+			self.min = ns
+		if ns > self.max:
+			self.max = ns
+
+
+	def percentile(self, p):
+		"""
+		:param p: 0..100
+		:returns: upper bound (ns) of the bucket where the percentile is, None if empty
+		"""
+		if self.count == 0:
+			return None
+		limit = self.count*p/100.
+		seen = 0
+		for i,n in enumerate(self.buckets):
+			seen += n
+			if (seen >= limit) and (n > 0):
+				return min(2**i, self.max)
+		return self.max
+
+
+	def stats(self):
+		"""
+		:rtype: dict
+		"""
+		if self.count == 0:
+			return {"count":0}
+		return {
+			"count":self.count,
+			"mean":self.total/float(self.count),
+			"min":self.min,
+			"max":self.max,
+			"p50":self.percentile(50),
+			"p90":self.percentile(90),
+			"p99":self.percentile(99),
+			}
+
+
+
+class Instruments(object):
+	"""
+	The histograms of the stages. Thread safe.
+	An Instruments object can be shared by client and server (in one process), or each has its own.
+	"""
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._hists = {}
+
+
+	def add(self, stage, ns):
+		"""
+		:param stage: one of the STAGES, or a custom str
+		:param ns: duration in nanoseconds, as int
+		"""
+		self._lock.acquire()
+		try:
+			hist = self._hists.get(stage)
+			if hist is None:
+				hist = self._hists[stage] = Histogram()
+			hist.add(ns)
+		finally:
+			self._lock.release()
+
+
+	def histogram(self, stage):
+		"""
+		:returns: the Histogram, None if the stage was not measured
+		"""
+		return self._hists.get(stage)
+
+
+	def stats(self):
+		"""
+		:returns: {stage: dict}, with the stages measured so far, see L{Histogram.stats}
+		"""
+		self._lock.acquire()
+		try:
+			return dict((stage,hist.stats()) for stage,hist in self._hists.items())
+		finally:
+			self._lock.release()
+
+
+	def reset(self):
+		self._lock.acquire()
+		try:
+			self._hists = {}
+		finally:
+			self._lock.release()
@@ -27,7 +27,10 @@
 
 
 
-from logging import Handler,CRITICAL,ERROR,WARNING,INFO,DEBUG,NOTSET
+from logging import Handler,LogRecord,CRITICAL,ERROR,WARNING,INFO,DEBUG,NOTSET
+
+from rrlog import stack
+from rrlog.queueclient import QueueServerProxy, OVERFLOW_BLOCK
 
 
 LEVELMAP = {
@@ -72,6 +75,189 @@ def handler(*args, **kwargs):
 	return _Handler(*args, **kwargs)
 
 
+class _BridgeHandler(Handler):
+	"""
+	Takes the caller info (file, line, function, thread, time) from the LogRecord,
+	instead of extracting the stack again.
+	The message is formatted by the log server, and only if it is written (like with the args of L{rrlog.Log.__call__}).
+	"""
+	def __init__(self, log, level=NOTSET, extraStack=0):
+		"""
+		:param log: Your ready-to-use log object
+		:param level: One of the ordered standard logging constants (INFO, ERROR etc.)
+		:param extraStack: count of additional stack levels above the logging call, to log as call path.
+		
+			0 (the default) uses the LogRecord only. Otherwise the stack is extracted, but not deeper than extraStack+1.
+			The stack can't be extracted when the record is emitted by another thread (e.g. logging.handlers.QueueListener);
+			the LogRecord is used then.
+		"""
+		Handler.__init__(self, level)
+		self._log = log
+		self.extraStack = extraStack
+
+
+	def handle(self, record):
+		"""
+		As Handler.handle, without holding the handler lock while emitting: The Log is thread safe.
+		"""
+		rv = self.filter(record)
+		if isinstance(rv, LogRecord): # a filter may return a modified record (Python 3.12+)
+			record = rv
+		if rv:
+			self.emit(record)
+		return rv
+
+
+	def emit(self, record):
+		cat = LEVELMAP.get(record.levelno, "")
+		if self._log.enabled(cat):
+			self._log.log_at(*self._logAtArgs(record, cat))
+
+
+	def _logAtArgs(self, record, cat):
+		"""
+		:returns: tuple of the L{rrlog.Log.log_at} arguments for the record
+		"""
+		msg = record.msg
+		if not isinstance(msg, str):
+			msg = str(msg) # as LogRecord.getMessage does
+		args = record.args
+		if not args:
+			args = None
+		elif not isinstance(args, tuple):
+			args = (args,) # a single dict, the mapping for the msg
+			
+		path = None
+		if self.extraStack:
+			path,cfuncname,tblen = self._callerPath(record)
+		if path is None:
+			path,cfuncname,tblen = ((record.pathname, record.lineno),), record.funcName, 0
+			
+		if (record.thread is None) or (record.process is None):
+			ident = None # logging.logThreads or logProcesses is off
+		else:
+			ident = (record.process, record.thread, record.threadName)
+			
+		return msg, cat, path, cfuncname, tblen, None, args, ident, record.created
+
+
+	def _callerPath(self, record):
+		"""
+		:returns: path,cfuncname,tblen from the stack, or None,None,None if the logging call is not in my stack
+		"""
+		frame = stack.getframe(1)
+		while frame is not None:
+			if (frame.f_lineno == record.lineno) and (frame.f_code.co_filename == record.pathname):
+				return self._log.callpath(frame, self.extraStack+1)
+			frame = frame.f_back
+		return None,None,None
+
+
+def bridge(*args, **kwargs):
+	"""
+	:returns: Handler for the standard logging, taking the caller info from the LogRecords. See L{_BridgeHandler.__init__}
+	"""
+	return _BridgeHandler(*args, **kwargs)
+
+
+class _RecordServer(object):
+	"""
+	Server for the L{_RecordQueue}, takes LogRecords and logs them into the Log.
+	"""
+	def __init__(self, handler):
+		self._handler = handler
+
+
+	def log(self, logRecord):
+		handler = self._handler
+		handler._log.log_at(*handler._logAtArgs(logRecord, LEVELMAP.get(logRecord.levelno, "")))
+
+
+	def log_batch(self, logRecords):
+		handler = self._handler
+		handler._log.log_at_batch([
+			handler._logAtArgs(logRecord, LEVELMAP.get(logRecord.levelno, ""))
+			for logRecord in logRecords
+			])
+
+
+class _RecordQueue(QueueServerProxy):
+	"""
+	Queue of LogRecords (instead of rrlog records)
+	"""
+	def _cat(self, logRecord):
+		return LEVELMAP.get(logRecord.levelno, "")
+
+
+	def _ts(self, logRecord):
+		return logRecord.created
+
+
+class _QueueHandler(_BridgeHandler):
+	"""
+	Like the L{_BridgeHandler}, but the emitting thread only puts the LogRecord into a queue.
+	A background thread takes the LogRecords and logs them into the Log in batches
+	(see L{rrlog.queueclient.QueueServerProxy}).
+	
+	The category check is done before queueing. The caller info is taken from the LogRecord.
+	The record args are formatted later, so don't pass objects that change after the logging call.
+	
+	Queued records are logged at interpreter exit (logging.shutdown), or with an explicit flush / close.
+	"""
+	def __init__(self, log, level=NOTSET, maxlen=10000, overflow=OVERFLOW_BLOCK, dropCats=("D",""), errorHandler="stderr"):
+		"""
+		:param log: Your ready-to-use log object
+		:param level: One of the ordered standard logging constants (INFO, ERROR etc.)
+		:param maxlen, overflow, dropCats, errorHandler: see L{rrlog.queueclient.QueueServerProxy.__init__}.
+			The overflow policy is applied to LogRecords, with the category of the LEVELMAP.
+		"""
+		_BridgeHandler.__init__(self, log, level)
+		self._queue = _RecordQueue(
+			_RecordServer(self),
+			maxlen=maxlen,
+			overflow=overflow,
+			dropCats=dropCats,
+			errorHandler=errorHandler,
+			)
+
+
+	@property
+	def dropped(self):
+		"""
+		count of LogRecords dropped because of queue overflow
+		"""
+		return self._queue.dropped
+
+
+	def emit(self, record):
+		if self._log.enabled(LEVELMAP.get(record.levelno, "")):
+			self._queue.log(record)
+
+
+	def flush(self, timeout=None):
+		"""
+		Blocks until all records queued so far are logged.
+		:returns: True if the queue is empty, False on timeout
+		"""
+		return self._queue.flush(timeout)
+
+
+	def close(self):
+		"""
+		Logs all queued records, and stops the background thread.
+		Later records are logged directly by the emitting thread. The Log is not closed.
+		"""
+		self._queue.close()
+		Handler.close(self)
+
+
+def queued(*args, **kwargs):
+	"""
+	:returns: Handler for the standard logging, that logs in a background thread. See L{_QueueHandler.__init__}
+	"""
+	return _QueueHandler(*args, **kwargs)
+
+
 def useALogger():
 	logger = logging.getLogger("gimmeALogger")
 	for i in range(0,7):
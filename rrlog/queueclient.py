@@ -0,0 +1,305 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+@summary:
+Non-blocking log calls: The messages are put into a bounded queue,
+and a background thread feeds the real log server.
+The application thread never waits for a slow writer or a stalled remote server
+(except with the "block" overflow policy, when the queue is full.)
+
+Usage: Wrap any server (local log server or remote proxy)::
+
+	log = rrlog.Log(server=QueueServerProxy(printwriter.createServer()))
+	...
+	log.close() # optional, happens at exit anyway
+
+@author: Ruben Reifenberg
+"""
+
+import atexit
+import collections
+import threading
+import time
+import weakref
+
+import rrlog
+from rrlog import record
+from rrlog import instrument
+
+
+# Overflow policies, what to do when the queue is full:
+OVERFLOW_BLOCK = "block" # the log call waits for free queue space
+OVERFLOW_DROP_NEWEST = "drop-newest" # the current message is dropped
+OVERFLOW_DROP_OLDEST = "drop-oldest" # the oldest queued message is dropped
+OVERFLOW_DROP_CATS = "drop-by-category" # drop messages of the dropCats only. Other messages wait like with "block".
+
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_CATS)
+
+EXIT_TIMEOUT = 5.0 # max.secs each open queue may take to drain at interpreter exit
+
+_open = weakref.WeakSet() # QueueServerProxies not yet closed, closed at exit
+
+def _closeAll():
+	for proxy in list(_open):
+		proxy.close(EXIT_TIMEOUT)
+
+atexit.register(_closeAll)
+
+
+class QueueServerProxy(object):
+	"""
+	Puts the log data into a queue, the wrapped server is called by a single background thread.
+	
+	The background thread is a daemon; queued messages are logged at interpreter exit (atexit,
+	waiting at most EXIT_TIMEOUT secs) or with an explicit L{flush} / L{close}.
+	
+	@ivar dropped: count of messages dropped because of queue overflow
+	"""
+	def __init__(self,
+		server,
+		maxlen=10000,
+		overflow=OVERFLOW_BLOCK,
+		dropCats=("D",""),
+		errorHandler="stderr",
+		instruments=None,
+		):
+		"""
+		:param server: The server to feed, e.g. a LogServer or a remote LogServerProxy
+		:param maxlen: max.count of queued messages
+		:param overflow: One of the OVERFLOW_... policies, what to do when maxlen is reached.
+		:param dropCats: cats that are dropped first, used by the OVERFLOW_DROP_CATS policy
+		
+			With that policy, a queued message of the dropCats is dropped to make room for a message of another cat.
+			When no such message is queued, the log call blocks.
+			
+		:param errorHandler: Receives any Exception that the server raises.
+			Same meaning as for L{rrlog.Log.__init__}, but the exceptions can't reach the application:
+			None is not allowed, default is "stderr".
+			
+		:param instruments: None, or L{rrlog.instrument.Instruments} to measure the log call (ENQUEUE)
+			and the time from building a record until the thread takes it from the queue (DEQUEUE)
+		"""
+		assert maxlen > 0, "maxlen must be >0, not %s"%(maxlen)
+		assert overflow in OVERFLOW_POLICIES, "unknown overflow policy %s, use one of %s"%(overflow,OVERFLOW_POLICIES)
+		assert errorHandler is not None, "need an errorHandler, exceptions can't reach the application"
+		if str(errorHandler).lower()=="stderr": errorHandler=rrlog.StderrErrorHandler()
+		elif str(errorHandler).lower()=="stdout": errorHandler=rrlog.StdoutErrorHandler()
+		elif str(errorHandler).lower()=="silent": errorHandler=rrlog.SilentErrorHandler()
+		elif isinstance(errorHandler,str): raise TypeError("probably mistyped str value for errorHandler:%s"%(errorHandler))
+
+		self._server = server
+		self._log_batch = getattr(server,"log_batch",None) # the thread passes what it takes from the queue at once
+		self._errorHandler = errorHandler
+		self.maxlen = maxlen
+		self.overflow = overflow
+		self.dropCats = dropCats
+		self.dropped = 0
+		self.instruments = instruments
+		
+		self._q = collections.deque()
+		self._busy = 0 # count of messages taken from the queue but not yet logged
+		self._closed = False
+		self._lock = threading.Lock()
+		self._notEmpty = threading.Condition(self._lock)
+		self._notFull = threading.Condition(self._lock)
+		self._done = threading.Condition(self._lock)
+		
+		self._thread = threading.Thread(target=self._drain, name="rrlog-queue")
+		self._thread.daemon = True
+		self._thread.start()
+		_open.add(self)
+
+
+	def addClient(self):
+		return self._server.addClient()
+
+
+	def _cat(self, jobdata):
+		return jobdata[record.CAT]
+
+
+	def _ts(self, jobdata):
+		return jobdata[record.TS]
+
+
+	def _dropCatsItem(self):
+		"""
+		Remove the oldest queued message of the dropCats.
+		:returns: True if one was found
+		"""
+		for i,jobdata in enumerate(self._q):
+			if self._cat(jobdata) in self.dropCats:
+				del self._q[i]
+				return True
+		return False
+
+
+	def log(self, jobdata):
+		"""
+		Enqueue, or log directly when the queue is already closed.
+		"""
+		instruments = self.instruments
+		if instruments is not None:
+			t0 = instrument.clock()
+		self._lock.acquire()
+		try:
+			while len(self._q) >= self.maxlen and not self._closed:
+				if self.overflow == OVERFLOW_DROP_NEWEST:
+					self.dropped += 1
+					return
+				elif self.overflow == OVERFLOW_DROP_OLDEST:
+					self._q.popleft()
+					self.dropped += 1
+				elif self.overflow == OVERFLOW_DROP_CATS:
+					if self._cat(jobdata) in self.dropCats:
+						self.dropped += 1
+						return
+					elif self._dropCatsItem():
+						self.dropped += 1
+					else:
+						self._notFull.wait()
+				else:
+					self._notFull.wait()
+					
+			direct = self._closed
+			if not direct:
+				self._q.append(jobdata)
+				self._notEmpty.notify()
+		finally:
+			self._lock.release()
+			
+		if instruments is not None:
+			instruments.add(instrument.ENQUEUE, instrument.clock()-t0)
+		if direct:
+			self._server.log(jobdata)
+
+
+	def log_batch(self, jobdatas):
+		"""
+		Enqueues the jobs one by one (the background thread may pass them to the server as a batch).
+		"""
+		for jobdata in jobdatas:
+			self.log(jobdata)
+
+
+	def _drain(self):
+		"""
+		Background thread loop: Feeds the server until closed, and the queue is empty.
+		"""
+		while True:
+			self._lock.acquire()
+			try:
+				while not self._q and not self._closed:
+					self._notEmpty.wait()
+				if not self._q:
+					return # closed
+				batch = list(self._q)
+				self._q.clear()
+				self._busy = len(batch)
+				self._notFull.notify_all()
+			finally:
+				self._lock.release()
+				
+			instruments = self.instruments
+			if instruments is not None:
+				t = time.time()
+				for jobdata in batch:
+					instruments.add(instrument.DEQUEUE, int((t-self._ts(jobdata))*1e9))
+				
+			if self._log_batch is not None:
+				try:
+					self._log_batch(batch)
+				except Exception as e:
+					self._errorHandler.handleException(e)
+			else:
+				for jobdata in batch:
+					try:
+						self._server.log(jobdata)
+					except Exception as e:
+						self._errorHandler.handleException(e)
+					
+			self._lock.acquire()
+			try:
+				self._busy = 0
+				self._done.notify_all()
+			finally:
+				self._lock.release()
+
+
+	def qsize(self):
+		"""
+		:returns: count of messages not yet logged
+		"""
+		return len(self._q)+self._busy
+
+
+	def flush(self, timeout=None):
+		"""
+		Blocks until all messages queued so far are logged.
+		Then, flushes the server if it has a flush() method.
+		:param timeout: max.secs to wait, None==no limit
+		:returns: True if the queue is empty, False on timeout
+		"""
+		if timeout is not None:
+			deadline = time.monotonic()+timeout
+		self._lock.acquire()
+		try:
+			while (self._q or self._busy) and self._thread.is_alive():
+				if timeout is None:
+					self._done.wait()
+				else:
+					remaining = deadline-time.monotonic()
+					if remaining <= 0 or not self._done.wait(remaining):
+						break
+			empty = not (self._q or self._busy)
+		finally:
+			self._lock.release()
+		flush = getattr(self._server,"flush",None)
+		if empty and (flush is not None):
+			flush()
+		return empty
+
+
+	def close(self, timeout=None):
+		"""
+		Logs all queued messages, then stops the background thread.
+		Later log calls are passed to the server directly (blocking).
+		Then, closes the server if it has a close() method. Repeated calls are harmless.
+		:param timeout: max.secs to wait for the thread, None==no limit
+		"""
+		self._lock.acquire()
+		try:
+			if self._closed:
+				return
+			self._closed = True
+			_open.discard(self)
+			self._notEmpty.notify_all()
+			self._notFull.notify_all()
+		finally:
+			self._lock.release()
+			
+		if self._thread is not threading.current_thread():
+			self._thread.join(timeout)
+			
+		close = getattr(self._server,"close",None)
+		if close is not None:
+			close()
@@ -0,0 +1,61 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+
+"""
+The record a log call produces, shared by the client (L{rrlog.Log}) and the server (L{rrlog.server.LogServer}).
+
+A record is a plain tuple, the most compact structure Python has for that.
+Remote clients send it as it is (json/pickle); in-process logging hands the same tuple to the server,
+which assigns its items to a MsgJob without building intermediate argument dicts.
+Use the index constants below instead of literal numbers.
+@author: Ruben Reifenberg
+"""
+
+FIELDS = (
+	"msgid",
+	"pid",
+	"tid",
+	"threadname",
+	"ts",
+	"msg", # the message, or its template if args is not None
+	"cat",
+	"path",
+	"tblen",
+	"cfunc",
+	"special",
+	"args",
+	)
+
+(
+	MSGID,
+	PID,
+	TID,
+	THREADNAME,
+	TS,
+	MSG,
+	CAT,
+	PATH,
+	TBLEN,
+	CFUNC,
+	SPECIAL,
+	ARGS,
+	) = range(len(FIELDS))
@@ -0,0 +1,173 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+@summary:
+Client side rate limiting and sampling per call site.
+A chatty log call (e.g. inside a loop) is thinned out at the application side,
+before it costs stack extraction and transport, and before it floods a log server queue.
+
+Example: 1 of 100 debug messages per call site, max. 5 warnings/second (burst 20) per call site,
+other categories (e.g. "E") are not limited::
+
+	log.sampler = Sampler({
+		"D": lambda: OneInN(100),
+		"W": lambda: TokenBucket(rate=5, burst=20),
+		})
+
+The count of suppressed messages of a call site is added to the "special" dict
+of the next message logged by that call site (key: "suppressed").
+@author: Ruben Reifenberg
+"""
+
+import threading
+import time
+
+try:
+	clock = time.monotonic
+except AttributeError: # Python < 3.3
+	clock = time.time
+
+
+SPECIAL_KEY = "suppressed" # key in the special dict for the count of suppressed messages
+
+
+class TokenBucket(object):
+	"""
+	Allows rate messages per second on average, with bursts up to burst messages.
+	"""
+	def __init__(self, rate, burst=None):
+		"""
+		:param rate: float >0, messages per second
+		:param burst: max.count of messages in a row, default: rate (but >=1)
+		"""
+		assert rate > 0, "rate must be >0, not %s"%(rate)
+		if burst is None:
+			burst = max(rate,1)
+		self.rate = rate
+		self.burst = burst
+		self._tokens = burst
+		self._t = None
+		
+		
+	def allow(self, t):
+		"""
+		:param t: current time in secs
+		:returns: True if the message can be logged
+		"""
+		if self._t is not None:
+			self._tokens = min(self.burst, self._tokens+(t-self._t)*self.rate)
+		self._t = t
+		if self._tokens >= 1:
+			self._tokens -= 1
+			return True
+		return False
+
+
+class OneInN(object):
+	"""
+	Allows the first message, then every n-th.
+	"""
+	def __init__(self, n):
+		assert n >= 1, "n must be >=1, not %s"%(n)
+		self.n = n
+		self._i = 0
+		
+		
+	def allow(self, t):
+		res = (self._i%self.n == 0)
+		self._i += 1
+		return res
+
+
+class WindowCap(object):
+	"""
+	Allows max. maxCount messages per time window.
+	A window starts with the first message after the previous window ended.
+	"""
+	def __init__(self, maxCount, windowSecs):
+		assert windowSecs > 0, "windowSecs must be >0, not %s"%(windowSecs)
+		self.maxCount = maxCount
+		self.windowSecs = windowSecs
+		self._start = None
+		self._count = 0
+		
+		
+	def allow(self, t):
+		if (self._start is None) or (t >= self._start+self.windowSecs):
+			self._start = t
+			self._count = 0
+		self._count += 1
+		return self._count <= self.maxCount
+
+
+class Sampler(object):
+	"""
+	Decides per call site whether a log call is logged or suppressed.
+	A call site is (filename, line number, cat).
+	Each call site gets an own limiter (e.g. TokenBucket, OneInN, WindowCap),
+	created by the factory configured for the cat.
+	"""
+	def __init__(self, policies, default=None, maxSites=10000, clock=clock):
+		"""
+		:param policies: {cat: factory}, where factory is a callable without args returning a new limiter.
+			A limiter is any object with an allow(t) method, see the classes of this module.
+		:param default: factory for the cats not found in policies.
+			None == such cats are never suppressed.
+		:param maxSites: when more call sites are known, all are forgotten (and start again with fresh limiters)
+		:param clock: returns the current time in secs
+		"""
+		self._policies = policies
+		self._default = default
+		self._maxSites = maxSites
+		self._clock = clock
+		self._sites = {} # (filename,lineno,cat): [limiter,suppressed-count]
+		self._lock = threading.Lock()
+		
+		
+	def __call__(self, filename, lineno, cat):
+		"""
+		:returns: None if the message is to be suppressed.
+			Otherwise, the count of messages suppressed (of that call site) since the last logged one.
+		"""
+		key = (filename,lineno,cat)
+		self._lock.acquire()
+		try:
+			try:
+				site = self._sites[key]
+			except KeyError:
+				factory = self._policies.get(cat,self._default)
+				if factory is None:
+					return 0
+				if len(self._sites) >= self._maxSites:
+					self._sites.clear()
+				site = [factory(),0]
+				self._sites[key] = site
+				
+			if site[0].allow(self._clock()):
+				suppressed = site[1]
+				site[1] = 0
+				return suppressed
+			else:
+				site[1] += 1
+				return None
+		finally:
+			self._lock.release()
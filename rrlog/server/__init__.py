@@ -26,12 +26,27 @@ Part of the log which can (optionally) be in a separate process.
 """
 
 from sys import stderr
-from datetime import datetime
-from rrlog.tool import mStrftime,ListRotator,traceToShortStr
+from rrlog.tool import TimestampRenderer,ListRotator,traceToShortStr,format_msg
 from rrlog.globalconst import warn
-import collections
+import threading
+from collections.abc import Sequence
+from rrlog import instrument
 
 EMPTYDICT = {}
+_UNFORMATTED = object() # MsgJob.msg is not yet formatted
+_UNSCANNED = -1 # MsgJob._iCfn is not yet searched
+DROP = object() # returned by a filter: the job is not written and not observed
+
+
+def _cats(x):
+	"""
+	:returns: the cats that a filter or observer handles (its "cats" attribute), None for all cats
+	"""
+	cats = getattr(x, "cats", None)
+	if (cats is None) and hasattr(x, "__self__"):
+		cats = getattr(x.__self__, "cats", None) # the observe() method of an observer
+	assert not isinstance(cats,str),"cats of %s must be a tuple/list of cat, not '%s'"%(x,cats)
+	return cats
 
 
 class ColumnConfigurationMismatch(Exception):
@@ -53,45 +68,112 @@ class MsgJob(object):
 	@ivar threadname: part of client identification
 	@ivar msgid: int, id of the message. Unique in the client.
 	@ivar msg: str, msg as created by the client.
+		When the client sent a template with args, msg is formatted at first access.
+	@ivar template: str, the msg as given to the log call, unformatted. This can serve as a key to group messages.
+	@ivar args: the args given to the log call, or None
 	@ivar ts: str, timestamp
 	@ivar special: dict with custom items (see "special" argument of the log method)
 	@ivar tblen: len of the client traceback when the log method was called
 	@ivar path: client traceback path as sequence of (filename, linenumber). [0] is the latest (where the log call happened)
+		Don't modify it, the formatted path is cached. Use copy_update to get a job with another path.
+	
+	Jobs have no instance dict (__slots__), custom attributes can't be set. Put custom data into "special".
 	"""
-	#			msgid, pid, tid, threadname, ts, msg, cat, path, tblen, cfunc, special):
-	def __init__(self,msgid, pid, tid, threadname,ts,msg,cat,path,tblen,cfunc,special,formatter):
+	__slots__ = (
+		"msgid","pid","tid","threadname","ts","template","args","_msg","cat","path","tblen","cfunc","special",
+		"_formatter",
+		"_iCfn", # index of cfn in path (first non-None element), searched at first need
+		"_pathStr", # None, or (imin, formatted path) of the last pathStr call
+		)
+	
+	#			msgid, pid, tid, threadname, ts, msg, cat, path, tblen, cfunc, special, args):
+	def __init__(self,msgid, pid, tid, threadname,ts,msg,cat,path,tblen,cfunc,special,args=None,formatter=None):
 		"""
 		:param special: data for custom observers only
 		:param ts (str): timestamp
+		:param args: None, or the args to merge into the msg (template)
 		"""
 		self.pid = pid
 		self.tid = tid
 		self.threadname = threadname
 		self.msgid = msgid
-		self.msg = msg
 		self.ts = ts
-		if special is None: self.special = EMPTYDICT
-		else: self.special = special
 		self.cat = cat
 		self.path = path
 		self.tblen = tblen
-		self._formatter = formatter
 		self.cfunc = cfunc
-		self._iCfn = None # index of cfn in path (first non-None element)
-		
-		for i,(cfn,cln) in enumerate(path):
-			if cfn is not None:
-				self._iCfn = i
-				break
+		self._formatter = formatter
+		self._init_msg(msg, special, args)
 
 
+	def reinit(self, record, formatter):
+		"""
+		Re-uses me for another record, which is faster than creating a new job.
+		:param record: see L{rrlog.record}
+		"""
+		if len(record) != 12: # a client of an older version
+			self.__init__(formatter=formatter,*record)
+			return
+		(
+			self.msgid,
+			self.pid,
+			self.tid,
+			self.threadname,
+			self.ts,
+			msg,
+			self.cat,
+			self.path,
+			self.tblen,
+			self.cfunc,
+			special,
+			args,
+			) = record
+		self._formatter = formatter
+		self._init_msg(msg, special, args)
+
+
+	def _init_msg(self, msg, special, args):
+		self.template = msg
+		self.args = args
+		if args is None: self._msg = msg
+		else: self._msg = _UNFORMATTED
+		if special is None: self.special = EMPTYDICT
+		else: self.special = special
+		self._iCfn = _UNSCANNED
+		self._pathStr = None
+
+
+	def _get_iCfn(self):
+		i = self._iCfn
+		if i is _UNSCANNED:
+			i = None
+			for j,(cfn,cln) in enumerate(self.path):
+				if cfn is not None:
+					i = j
+					break
+			self._iCfn = i
+		return i
+
+
+	def _get_msg(self):
+		if self._msg is _UNFORMATTED:
+			self._msg = format_msg(self.template, self.args)
+		return self._msg
+	
+	def _set_msg(self, msg):
+		self._msg = msg
+		
+	msg = property(_get_msg, _set_msg)
+	
+	
 	def cfn(self):
 		"""
 		:rtype: str
 		:returns: Callers File Name
 		"""
-		if self._iCfn is not None:
-			return self._formatter.format_fname(self.path[self._iCfn][0])
+		i = self._get_iCfn()
+		if i is not None:
+			return self._formatter.format_fname(self.path[i][0])
 		else:
 			return None
 		
@@ -101,8 +183,9 @@ class MsgJob(object):
 		:rtype: int
 		:returns: Callers Line Number
 		"""
-		if self._iCfn is not None:
-			return self.path[self._iCfn][1]
+		i = self._get_iCfn()
+		if i is not None:
+			return self.path[i][1]
 		else:
 			return -1
 
@@ -115,7 +198,7 @@ class MsgJob(object):
 		"""
 		import warnings
 		warnings.warn("use format_dict argument of DBLogWriter.__init__",DeprecationWarning)
-		# self.__dict__ wouldn't have the formatted stuff like cfn
+		# the slots wouldn't have the formatted stuff like cfn
 		res = dict(
 			pid=self.pid,
 			threadname = self.threadname,
@@ -143,29 +226,30 @@ class MsgJob(object):
 		:rtype: str
 		:returns: path as formatted str
 		"""
-		return self._formatter.pathAsStr(self.path, imin=imin)
+		cached = self._pathStr
+		if (cached is not None) and (cached[0] == imin):
+			return cached[1]
+		res = self._formatter.pathAsStr(self.path, imin=imin)
+		self._pathStr = (imin, res)
+		return res
 
 
 	def copy_update(self, kwargs):
 		"""
 		:returns: new instance with my init kwargs but updated with the given kwargs
 		"""
-		oldkwargs = {
-			"pid":self.pid,
-			"threadname":self.threadname,
-			"msgid":self.msgid,
-			"msg":self.msg,
-			"ts":self.ts,
-			"special":self.special,
-			"cat":self.cat,
-			"path":self.path,
-			"tblen":self.tblen,
-			"cfunc":self.cfunc,
-			"formatter":self._formatter,
-			}
-		oldkwargs.update(kwargs)
-		
-		return self.__class__(**oldkwargs)
+		res = object.__new__(self.__class__)
+		for name in MsgJob.__slots__:
+			setattr(res, name, getattr(self, name))
+		for name,value in kwargs.items():
+			if name == "formatter":
+				name = "_formatter"
+				res._pathStr = None
+			elif name == "path":
+				res._iCfn = _UNSCANNED
+				res._pathStr = None
+			setattr(res, name, value)
+		return res
 
 	
 	def __str__(self):
@@ -181,6 +265,109 @@ class MsgJob(object):
 	
 
 
+class JobHistory(Sequence):
+	"""
+	The N last jobs, as a fixed-size ring buffer. Appending is O(1), also for large sizes.
+	Read-only sequence (like a list) for filters and observers: the oldest job at [0], the latest at [-1].
+	Slices return lists.
+	"""
+	__slots__ = ("_buf","_size","_start","_len")
+	
+	def __init__(self, size):
+		assert size>0, "need at least a history size of 1, not %s"%(size)
+		self._buf = [None]*size
+		self._size = size
+		self._start = 0 # index of the oldest job in _buf
+		self._len = 0
+
+
+	def append(self, job):
+		"""
+		:returns: the job that dropped out of the history, None if the history was not full
+		"""
+		if self._len < self._size:
+			self._buf[(self._start+self._len)%self._size] = job
+			self._len += 1
+			return None
+		start = self._start
+		dropped = self._buf[start]
+		self._buf[start] = job
+		self._start = (start+1)%self._size
+		return dropped
+
+
+	def __len__(self):
+		return self._len
+
+
+	def __getitem__(self, i):
+		if isinstance(i, slice):
+			return [self[j] for j in range(*i.indices(self._len))]
+		if i < 0:
+			i += self._len
+		if not (0 <= i < self._len):
+			raise IndexError("job history index out of range")
+		return self._buf[(self._start+i)%self._size]
+
+
+	def pop(self):
+		"""
+		Removes the latest job.
+		:returns: the job
+		"""
+		if not self._len:
+			raise IndexError("pop from empty job history")
+		self._len -= 1
+		i = (self._start+self._len)%self._size
+		job = self._buf[i]
+		self._buf[i] = None
+		return job
+
+
+	def __iter__(self):
+		buf,start,size = self._buf,self._start,self._size
+		for i in range(self._len):
+			yield buf[(start+i)%size]
+
+
+	def __repr__(self):
+		return "JobHistory(%r)"%(list(self))
+
+
+
+class MsgJobPool(object):
+	"""
+	Jobs to re-use, which is faster than creating new jobs (and relieves the GC).
+	Only jobs that nobody refers to anymore may be released into the pool.
+	"""
+	__slots__ = ("_free","maxsize")
+	
+	def __init__(self, maxsize=16):
+		"""
+		:param maxsize: max.count of free jobs kept. 0 disables the re-use.
+		"""
+		self._free = []
+		self.maxsize = maxsize
+
+
+	def acquire(self, record, formatter):
+		"""
+		:param record: see L{rrlog.record}
+		:returns: MsgJob, re-used or new
+		"""
+		if self._free:
+			job = self._free.pop()
+			job.reinit(record, formatter)
+			return job
+		return MsgJob(formatter=formatter,*record)
+
+
+	def release(self, job):
+		if len(self._free) < self.maxsize:
+			self._free.append(job)
+
+
+
 class RotateWriterFactory(object):
 	
 	def __init__(self, configs, writerFactory):
@@ -248,6 +435,15 @@ class RotateLogWriter(object):
 		self.writers[-1].writeNow(logrecord)
 
 
+	def flush(self):
+		"""
+		Flushes the current writer, if it buffers.
+		"""
+		flush = getattr(self.writers[-1],"flush",None)
+		if flush is not None:
+			flush()
+
+
 class LogServer(object):
 	"""
 	This can (but must not be) in the application process.
@@ -256,6 +452,7 @@ class LogServer(object):
 	CFN_SHORT = 1 # Caller File Names Minimal-Length
 	CFN_FULL = 2 # Caller File Names with Full path
 	CAT_INTERNALERROR = "I"
+	MEMO_MAX = 4096 # max.count of formatted file names and paths cached. A full cache is cleared.
 
 	def __init__(self,
 		writer,
@@ -264,8 +461,14 @@ class LogServer(object):
 		cfnMode=1,
 		tsFormat=None,
 		jobhistSize=100,
+		instruments=None,
 		):
 		"""
+		:param writer: The writer, or a list of writers that all write each message.
+		
+			A writer that fails doesn't stop the other writers; the first exception is raised after all writers are done.
+			Wrap a slow writer into a L{rrlog.server.threadedwriter.ThreadedWriter} to not delay the others.
+			
 		:param cfnMode: One of the MODE...constants.
 		
 			CFN_SHORT: Caller File Names minimal,i.e.file name without directory path(=Default)
@@ -282,23 +485,37 @@ class LogServer(object):
 			
 		:param observers: list of callables, called with args: jobhist, writer.
 		
-			Called each time after(!) a message was written.
-			writer is the specific writer (depends on DB/file/Stdout modus.)		
+			Called each time after(!) a message was written (with a ThreadedWriter: after it was queued).
+			writer is the specific writer (depends on DB/file/Stdout modus.), the first one of a writer list.
 			jobhist are the N last message-jobs, with the latests at [-1]. The size N of the jobhist
 			is limited by jobhistSize. Increase jobhistSize if your observer needs to see a large job history.
 			The observers are processed in the given order.
 			You can modify job content for following observers, without affecting the log (since the observers are called after
 			the line is written.)
 			For compatibility: An observer can also have an observe() method. If available, this is used (instead of __call__)
+			An observer with a "cats" attribute (a collection of categories) is called for these categories only.
+			The attribute is read when the server gets the first message of a category.
 			
 		:param filters: list of callable objects, analogous to observers.
 		
 			But filters are called before logging. When they modify the message, the change gets visible in the log.
+			When a filter returns L{DROP}, the job is removed from the jobhist and neither written nor observed,
+			following filters are not called.
 			
-		:param jobhistSize: The count of recent messages that are available as a list (these may be read by observers). Default=100
+		:param jobhistSize: The count of recent messages that are available as a sequence (these may be read by observers). Default=100
+		
+			The history is a L{JobHistory}, jobs that drop out of it are re-used (see L{MsgJobPool}).
+			Filters, observers and writers must not keep references to jobs for later.
+		
+		:param instruments: None, or L{rrlog.instrument.Instruments} to measure filters, writer and observers.
+		
+			Remote servers (socket, xmlrpc) use it to measure the deserialization, too.
+			Can be modified anytime (ivar "instruments").
 		
 		:raises AssertionError: if an observer is >1 times in the list
 		:raises AssertionError: if a filter is >1 times in the list
+		
+		@ivar dropped: count of jobs dropped by filters
 		"""
 		if filters is None:
 			filters=[]
@@ -316,10 +533,10 @@ class LogServer(object):
 		# BEGIN compatibility with v <= 0.1.4: Accept observers with observe() instead __call__(), too:
 		self._observers = []		
 		for i,x in enumerate(observers):
-			if hasattr(x,"observe") and isinstance(x.observe, collections.Callable):
+			if hasattr(x,"observe") and callable(x.observe):
 				self._observers.append(x.observe)
 			else:
-				assert isinstance(x, collections.Callable),"Observer %s must be callable (or need to have the deprecated observe() method)."%(x)
+				assert callable(x),"Observer %s must be callable (or need to have the deprecated observe() method)."%(x)
 				self._observers.append(x)
 		# END compatibility with v <= 0.1.4
 
@@ -327,8 +544,11 @@ class LogServer(object):
 			assert observers.count(x)==1, "%s is >1 times in observers list"%(x)
 
 		for i,x in enumerate(filters):
-			assert isinstance(x, collections.Callable),"Filter %s must be callable."%(x)
+			assert callable(x),"Filter %s must be callable."%(x)
 			assert filters.count(x)==1, "%s is >1 times in filters list"%(x)
+			
+		for x in filters+self._observers:
+			_cats(x) # assert the type
 
 
 		#self._time0 = datetime.now()
@@ -338,11 +558,25 @@ class LogServer(object):
 			"std1": "%H:%M.%S;%3N",
 			"std2": "%m/%d %H:%M.%S",
 			}.get(tsFormat, tsFormat)
+		self._renderTs = None # TimestampRenderer of the _tsFormat, created at first need
 		self._cfnMode = cfnMode
-		self._writer = writer
-		self._jobhist = []
-		assert jobhistSize>0, "need at least a history size of 1, not %s"%(jobhistSize)
-		self._jobhistSize = jobhistSize
+		self._dispatchByCat = {} # cat: (filters, observers) that handle the cat, each a tuple of (index, callable)
+		self.dropped = 0
+		self._fnames = {} # (cfnMode,file name): formatted
+		self._pathStrs = {} # (path,imin,cfnMode): formatted
+		if isinstance(writer, (list,tuple)):
+			assert len(writer)>0, "need at least one writer"
+			self._writers = list(writer)
+		else:
+			self._writers = [writer]
+		self._writer = self._writers[0]
+		self._jobhist = JobHistory(jobhistSize)
+		if any(getattr(w,"threaded",False) for w in self._writers):
+			self._jobpool = MsgJobPool(0) # queued jobs must not be re-used
+		else:
+			self._jobpool = MsgJobPool()
+		self._lock = threading.RLock()
+		self.instruments = instruments
 
 
 	def addObserver(self, observer):
@@ -352,11 +586,34 @@ class LogServer(object):
 		if observer in self._observers:
 			raise ObserverAlreadyAdded("already added: %s"%(observer))
 		
-		if hasattr(observer,"observe") and isinstance(observer.observe, collections.Callable):
-			self._observers.append(observer.observe)
+		if hasattr(observer,"observe") and callable(observer.observe):
+			observer = observer.observe
 		else:
-			assert isinstance(observer, collections.Callable),"Observer %s must be callable (or need to have the deprecated observe() method)."%(observer)
-			self._observers.append(observer)
+			assert callable(observer),"Observer %s must be callable (or need to have the deprecated observe() method)."%(observer)
+		_cats(observer) # assert the type
+		self._observers.append(observer)
+		self._dispatchByCat.clear()
+
+
+	def _dispatch(self, cat):
+		"""
+		:returns: (filters, observers) that handle the cat, each a tuple of (index, callable)
+		"""
+		try:
+			return self._dispatchByCat[cat]
+		except KeyError:
+			pass
+		res = tuple(
+			tuple(
+				(i,x) for i,x in enumerate(callables)
+				if (_cats(x) is None) or (cat in _cats(x))
+				)
+			for callables in (self._filters, self._observers)
+			)
+		if len(self._dispatchByCat) >= self.MEMO_MAX:
+			self._dispatchByCat.clear()
+		self._dispatchByCat[cat] = res
+		return res
 
 
 	def format_fname(self,name): # 0.2.1: renamed from cfnFormatted
@@ -366,6 +623,19 @@ class LogServer(object):
 		:returns: String,men-Readable Callers File Name (None is name was None)
 		:param name: File file name incl. path, or None
 		"""
+		key = (self._cfnMode, name)
+		try:
+			return self._fnames[key]
+		except KeyError:
+			pass
+		res = self._format_fname(name)
+		if len(self._fnames) >= self.MEMO_MAX:
+			self._fnames.clear()
+		self._fnames[key] = res
+		return res
+
+
+	def _format_fname(self, name):
 		if name is None:
 			return None
 		
@@ -394,6 +664,24 @@ class LogServer(object):
 		:returns: call path, formatted as str, Empty str if path is empty
 		:rtype: str
 		"""
+		key = (path, imin, self._cfnMode)
+		try:
+			return self._pathStrs[key]
+		except KeyError:
+			pass
+		except TypeError: # not hashable, e.g. lists of a remote client
+			key = (tuple([tuple(item) for item in path]), imin, self._cfnMode)
+			res = self._pathStrs.get(key)
+			if res is not None:
+				return res
+		res = self._pathAsStr(path, imin)
+		if len(self._pathStrs) >= self.MEMO_MAX:
+			self._pathStrs.clear()
+		self._pathStrs[key] = res
+		return res
+
+
+	def _pathAsStr(self, path, imin):
 		res = ""
 		lastWasOmitted = False
 		
@@ -433,42 +721,101 @@ class LogServer(object):
 		"""
 		if self._tsFormat is None:
 			return ""
-		else:
-			return mStrftime(dt,self._tsFormat)
+		renderTs = self._renderTs
+		if (renderTs is None) or (renderTs.format != self._tsFormat):
+			renderTs = self._renderTs = TimestampRenderer(self._tsFormat)
+		return renderTs.render_datetime(dt)
 
 
 	def log(self, jobdata):
 		"""
-		:param jobdata: Internal format. Do not rely on that structure since it will probably remain subject of refactorings.
+		:param jobdata: Internal format, see L{rrlog.record}. Do not rely on that structure since it will probably remain subject of refactorings.
 		"""
 #		kwargs = {"pid":pid,"threadname":threadname,"msgid":msgid,"msg":msg,"special":special,"cat":cat,"path":path,"tblen":tblen,"cfunc":cfunc,
 #				"formatter":self,"ts":self._timeStr(datetime.now())}
-		if len(self._jobhist) >= self._jobhistSize:
-			# gain a marginal relieving of the GC:
-			# re-use the popped job from history
-			# CARE FOR DOCUMENTING jobs cannot be stored in a filter etc.
-			job = self._jobhist.pop(0)
-			job.__init__(formatter=self,*jobdata)
-		else:
-			job = MsgJob(formatter=self,*jobdata)
-			
-		self.logJob(job)
+		# serialized because the writers, the jobhist (and its re-used jobs) are shared.
+		# Threads of one process logging locally meet here.
+		self._lock.acquire()
+		try:
+			self._log(jobdata)
+		finally:
+			self._lock.release()
+
+
+	def log_batch(self, jobdatas):
+		"""
+		Logs the jobs of a batch (see L{rrlog.Log.many}), in the given order,
+		with filters, writer and observers running for each job as with L{log}.
+		Other threads can't log between the jobs of a batch.
+		
+		:param jobdatas: sequence of jobdata, see L{log}
+		:raises: the first exception, after all jobs are processed
+		"""
+		error = None
+		self._lock.acquire()
+		try:
+			for jobdata in jobdatas:
+				try:
+					self._log(jobdata)
+				except Exception as e:
+					if error is None:
+						error = e
+		finally:
+			self._lock.release()
+		if error is not None:
+			raise error
+
+
+	def _log(self, jobdata):
+		self.logJob(self._jobpool.acquire(jobdata, self))
 
 
 	def logJob(self, job):
-		# maintain jobhist queue with current job at [-1]:
-		self._jobhist.append(job)
+		# maintain jobhist with current job at [-1]:
+		dropped = self._jobhist.append(job)
+		if dropped is not None:
+			self._jobpool.release(dropped)
+		
+		instruments = self.instruments
+		if instruments is not None:
+			t0 = instrument.clock()
 
-		for i,filter_ in enumerate(self._filters):
+		filters, observers = self._dispatch(job.cat)
+		verdict = None
+		for i,filter_ in filters:
 			try:
-				filter_(jobhist=self._jobhist, writer=self._writer)
-			except Exception:
+				verdict = filter_(jobhist=self._jobhist, writer=self._writer)
+			except Exception as e:
 				warn("filter %d:%s failed with %s, LogRecord was: %s. Trace=%s"%(i,filter_,e,job,traceToShortStr()))
+			else:
+				if verdict is DROP:
+					break
 
-		#todo: consider multiple writers aka Handlers
-		self._writer.writeNow(job)
+		if instruments is not None:
+			t1 = instrument.clock()
+			instruments.add(instrument.FILTERS, t1-t0)
+			
+		if verdict is DROP:
+			self.dropped += 1
+			self._jobpool.release(self._jobhist.pop())
+			return
+			
+		error = None
+		if len(self._writers) == 1:
+			self._writer.writeNow(job)
+		else:
+			for writer in self._writers:
+				try:
+					writer.writeNow(job)
+				except Exception as e:
+					if error is None:
+						error = e
+		
+		if instruments is not None:
+			t2 = instrument.clock()
+			instruments.add(instrument.WRITE, t2-t1)
 
-		for i,observer in enumerate(self._observers):
+		for i,observer in observers:
 			try:
 				observer(jobhist=self._jobhist, writer=self._writer)
 			except Exception as e:
@@ -478,4 +825,44 @@ class LogServer(object):
 					job,
 					traceToShortStr(6),
 					))
+					
+		if instruments is not None:
+			instruments.add(instrument.OBSERVERS, instrument.clock()-t2)
+			
+		if error is not None:
+			raise error
+
+
+	def writer_stats(self):
+		"""
+		:returns: list with an item for each writer: the stats() dict of a L{rrlog.server.threadedwriter.ThreadedWriter}, None for other writers
+		"""
+		return [
+			w.stats() if hasattr(w,"stats") else None
+			for w in self._writers
+			]
+
+
+	def flush(self):
+		"""
+		Blocks until the writers have written all messages so far (the ThreadedWriters)
+		"""
+		for writer in self._writers:
+			flush = getattr(writer,"flush",None)
+			if flush is not None:
+				flush()
+
+
+	def close(self):
+		"""
+		Writes all queued messages and stops the threads of the ThreadedWriters.
+		Later messages are written directly. Other writers are not closed, but flushed if they have a flush() method.
+		"""
+		for writer in self._writers:
+			if getattr(writer,"threaded",False):
+				writer.close()
+			else:
+				flush = getattr(writer,"flush",None)
+				if flush is not None:
+					flush()
 
@@ -24,18 +24,105 @@ logging into text files.
 @author: Ruben Reifenberg
 """
 
+import atexit
+import os
 import os.path
 try:
 	import _thread
 except ImportError: # Py3Migration
 	import thread as _thread
+import threading
+import time
 import warnings
+import weakref
 from rrlog import Log
 from rrlog import server
 from rrlog.server import textwriter
 
 
 open_ = open
+fsync_ = os.fsync
+
+FSYNC_NEVER = "never" # flush only (the data may remain in the OS cache)
+FSYNC_CATS = "cats" # fsync when flushing because of a message of the FlushPolicy cats
+FSYNC_FLUSH = "flush" # fsync with each flush
+
+FSYNC_POLICIES = (FSYNC_NEVER, FSYNC_CATS, FSYNC_FLUSH)
+
+
+class FlushPolicy(object):
+	"""
+	When a L{FileLogWriter} flushes its file. Without a FlushPolicy, the file is flushed after each line.
+	With a FlushPolicy, the lines are buffered until one of the limits is reached.
+	"""
+	def __init__(self, lines=100, chars=None, millis=200, cats=("E","C","F"), fsync=FSYNC_NEVER):
+		"""
+		:param lines: flush when that many lines are buffered. None == no limit
+		:param chars: flush when that many characters (~bytes) are buffered. None == no limit
+		:param millis: flush that many milliseconds after the first buffered line (by a timer thread). None == no timer
+		:param cats: flush immediately after a message of these categories, e.g. errors
+		:param fsync: One of the FSYNC_... policies, for durability of the flushed lines when the OS crashes.
+		"""
+		assert (lines is None) or lines > 0, "lines must be >0, not %s"%(lines)
+		assert (chars is None) or chars > 0, "chars must be >0, not %s"%(chars)
+		assert (millis is None) or millis > 0, "millis must be >0, not %s"%(millis)
+		assert fsync in FSYNC_POLICIES, "unknown fsync policy %s, use one of %s"%(fsync,FSYNC_POLICIES)
+		self.lines = lines
+		self.chars = chars
+		self.millis = millis
+		self.cats = frozenset(cats or ())
+		self.fsync = fsync
+
+
+	def __repr__(self):
+		return "%s[lines=%s,chars=%s,millis=%s,cats=%s,fsync=%s]"%(
+			self.__class__.__name__,self.lines,self.chars,self.millis,"".join(sorted(self.cats)),self.fsync)
+
+
+_buffering = weakref.WeakSet() # FileLogWriters with a FlushPolicy, flushed at exit as a last resort (close the log instead)
+
+def _flushAll():
+	for writer in list(_buffering):
+		writer.flush()
+
+atexit.register(_flushAll)
+
+
+_flusherWake = threading.Condition() # notified when a writer gets a flush deadline
+_flusherThread = None
+
+def _flusher():
+	"""
+	The single thread which does the timed flushes (FlushPolicy.millis) of all FileLogWriters.
+	"""
+	while True:
+		_flusherWake.acquire()
+		try:
+			dues = [due for due in (w._flushDue for w in list(_buffering)) if due is not None]
+			if not dues:
+				_flusherWake.wait()
+				continue
+			wait = min(dues)-time.monotonic()
+			if wait > 0:
+				_flusherWake.wait(wait)
+				continue
+		finally:
+			_flusherWake.release()
+		for writer in list(_buffering):
+			writer._timedFlush()
+
+def _wakeFlusher():
+	global _flusherThread
+	_flusherWake.acquire()
+	try:
+		if (_flusherThread is None) or not _flusherThread.is_alive(): # first use, or forked
+			_flusherThread = threading.Thread(target=_flusher, name="rrlog-flush")
+			_flusherThread.daemon = True
+			_flusherThread.start()
+		_flusherWake.notify()
+	finally:
+		_flusherWake.release()
+
 
 def createRotatingServer(
 	filePathPattern, 
@@ -47,7 +134,8 @@ def createRotatingServer(
 	logwriterFactory=None,
 	drop=True,
 	format_line=None,
-	fileClosed=None
+	fileClosed=None,
+	flushPolicy=None,
 	):
 	"""
 	:param filePathPattern: full log filename incl.path and placeholder for an int (rotate number). E.g."./mylog%d.txt"
@@ -59,16 +147,20 @@ def createRotatingServer(
 	:param logwriterFactory: Creates LogWriter instances (one per file). If None, the module variable LOGWRITER_CLASS is used.
 	:param format_line: See L{rrlog.server.textwriter.TextlineLogWriter.__init__}
 	:param fileClosed: Experimental, undocumented. Use case: Zip a log file after rotation. Parameter May change.
+	:param flushPolicy: None to flush each line, or a L{FlushPolicy} to buffer lines.
 	"""
 	if logwriterFactory is None:
 		logwriterFactory = lambda *args,**kwargs:LOGWRITER_CLASS(
 			format_line=format_line,
 			fileClosed=fileClosed,
+			flushPolicy=flushPolicy,
 			*args,
 			**kwargs
 			)		
 	elif format_line is not None:
 		warnings.warn("format_line is ignored because logwriterFactory is already specified")
+	elif flushPolicy is not None:
+		warnings.warn("flushPolicy is ignored because logwriterFactory is already specified")
 		
 	return server.LogServer(
 		writer = server.RotateLogWriter(
@@ -106,6 +198,7 @@ def createLocalLog(
 	name=None,
 	extractStack=True,
 	fileClosed=None,
+	flushPolicy=None,
 	):
 	"""
 	:param catsEnable: see L{rrlog.Log.__init__}
@@ -123,6 +216,9 @@ def createLocalLog(
 	:param name: The log can be identified by its optional name attribute (__repr__ method of the log will use it.)
 	:param extractStack: see L{rrlog.Log.__init__}
 	:param fileClosed: Experimental, undocumented. Use case: Zip a log file after rotation. Parameter May change.
+	:param flushPolicy: None to flush each line, or a L{FlushPolicy} to buffer lines.
+		Buffered lines are written with log.flush(), log.close() and rotation.
+		Close the log before exit; flushing at exit is a best effort only.
 	:returns: a Log ready to use
 	"""
 	try:
@@ -141,6 +237,7 @@ def createLocalLog(
 			drop=drop,
 			format_line=format_line,
 			fileClosed=fileClosed,
+			flushPolicy=flushPolicy,
 			),
 		traceOffset=traceOffset,
 		stackMax=stackMax,
@@ -202,15 +299,24 @@ class FileConfig(object):
 
 class FileLogWriter(textwriter.TextlineLogWriter):
 	"""
+	Writes utf-8 encoded lines.
 	"""
-	def __init__(self, config, format_line=None, fileClosed=None):
+	def __init__(self, config, format_line=None, fileClosed=None, flushPolicy=None):
 		"""
 		:param config: FileConfig
+		:param flushPolicy: None to flush each line, or a L{FlushPolicy} to buffer lines.
 		"""
 		textwriter.TextlineLogWriter.__init__(self, format_line=format_line)
 		
 		self._fileClosed = fileClosed
 		self._config = config
+		self._flushPolicy = flushPolicy
+		self._lock = threading.Lock() # the flush timer runs in another thread
+		self._bufferedLines = 0
+		self._bufferedChars = 0
+		self._flushDue = None # time.monotonic() of the timed flush, see FlushPolicy.millis
+		if flushPolicy is not None:
+			_buffering.add(self)
 		
 		if not config.lazy:
 			self._createFile()
@@ -221,12 +327,23 @@ class FileLogWriter(textwriter.TextlineLogWriter):
 	def _createFile(self):
 		self._logfile = open_(
 			self._config.filepath,
-			self._config.fileopenflag
+			self._config.fileopenflag,
+			encoding="utf-8",
 			)  # not file(). open seems to be kept with Py3k
 		
 		
 	def close(self):
-		self._logfile.close()
+		"""
+		Flushes and closes the file.
+		"""
+		self._lock.acquire()
+		try:
+			if (self._logfile is not None) and not getattr(self._logfile,"closed",False):
+				self._flush(self._bufferedLines and self._flushPolicy.fsync == FSYNC_FLUSH)
+				self._logfile.close()
+		finally:
+			self._lock.release()
+		_buffering.discard(self)
 		if self._fileClosed:
 			self._fileClosed(
 				FileClosedEvent(
@@ -236,26 +353,77 @@ class FileLogWriter(textwriter.TextlineLogWriter):
 				)
 
 
-	def writeNow(self, job):
+	def flush(self):
 		"""
-		Write without buffering, return when written.
-		Flushes the file after each write.
+		Writes the buffered lines.
 		"""
-		if self._logfile is None:
-			# filelazy was set, and this is the first log message: open file
-			self._createFile()
-			
-		self._lineCount += 1
+		self._lock.acquire()
+		try:
+			if self._bufferedLines and not getattr(self._logfile,"closed",False):
+				self._flush(self._flushPolicy.fsync == FSYNC_FLUSH)
+		finally:
+			self._lock.release()
+
+
+	def _flush(self, fsync):
+		self._logfile.flush()
+		if fsync:
+			fsync_(self._logfile.fileno())
+		self._bufferedLines = 0
+		self._bufferedChars = 0
+		self._flushDue = None
+
 
-		#todo: encode("utf-8") is rubbish
-		#lets specify unicode logging, and use codes.open with utf-8 or custom encoding
-		self._logfile.write(
-			self._format_line[0](
+	def _timedFlush(self):
+		"""
+		Flushes if the deadline of the timed flush is over. Called by the flusher thread.
+		"""
+		self._lock.acquire()
+		try:
+			due = self._flushDue
+			if (due is not None) and (due <= time.monotonic()):
+				if getattr(self._logfile,"closed",False):
+					self._flushDue = None
+				else:
+					self._flush(self._flushPolicy.fsync == FSYNC_FLUSH)
+		finally:
+			self._lock.release()
+
+
+	def writeNow(self, job):
+		"""
+		Writes the line. Without FlushPolicy, flushes the file after each write.
+		"""
+		self._lock.acquire()
+		try:
+			if self._logfile is None:
+				# filelazy was set, and this is the first log message: open file
+				self._createFile()
+				
+			self._lineCount += 1
+			line = self._format_line[0](
 				job,
 				self._lineCount
-				).encode("utf-8")
-			)
-		self._logfile.flush()
+				)
+			self._logfile.write(line)
+			
+			policy = self._flushPolicy
+			if policy is None:
+				self._logfile.flush()
+				return
+				
+			self._bufferedLines += 1
+			self._bufferedChars += len(line)
+			if job.cat in policy.cats:
+				self._flush(policy.fsync != FSYNC_NEVER)
+			elif ((policy.lines is not None) and (self._bufferedLines >= policy.lines)) \
+				or ((policy.chars is not None) and (self._bufferedChars >= policy.chars)):
+				self._flush(policy.fsync == FSYNC_FLUSH)
+			elif (policy.millis is not None) and (self._flushDue is None):
+				self._flushDue = time.monotonic()+policy.millis/1000.
+				_wakeFlusher() # one thread for all writers, instead of a timer thread per flush
+		finally:
+			self._lock.release()
 
 		
 	def __str__(self):
@@ -41,6 +41,7 @@ import time
 
 from rrlog.globalconst import remoteloads,warn
 from rrlog import globalconst
+from rrlog import instrument
 
 maxlen_jobdataq = 100000
 socketreceiver = None # .abort=True in the LogRecordSocketReceiver to exit
@@ -72,8 +73,18 @@ def processq():
 			if processq_stop or _i_am_orphan():
 				return
 		else:
+			instruments = getattr(rrlog_server,"instruments",None)
+			if type(pickled) is tuple: # (receive time, chunk), instruments were on at receive time
+				received,pickled = pickled
+				if instruments is not None:
+					t0 = instrument.clock()
+					instruments.add(instrument.DEQUEUE, t0-received)
+			elif instruments is not None:
+				t0 = instrument.clock()
 			try:
 				jobdata = remoteloads(pickled)
+				if instruments is not None:
+					instruments.add(instrument.DESERIALIZE, instrument.clock()-t0)
 			except Exception as e:
 				# no exit. there may be a process sending erroneously to me
 				warn("serialization protocol error: deserialize jobdata failed; a job is skipped (%s)"%e)
@@ -81,6 +92,9 @@ def processq():
 				if "ping" == jobdata:
 					# Someone wants to know whether I'm alive
 					pass
+				elif isinstance(jobdata, dict):
+					# {"batch": [jobdata,...]} from log_batch of the client
+					rrlog_server.log_batch(jobdata["batch"])
 				else:
 					rrlog_server.log(jobdata)
 
@@ -122,6 +136,8 @@ class LogRecordStreamHandler(py_socketserver.StreamRequestHandler):
 #			self.rrlog_server.log(obj)
 
 			if len(jobdataq) <= maxlen_jobdataq: # deque of python2.6 has maxlen but that throws away oldest elements
+				if getattr(rrlog_server,"instruments",None) is not None: # read per request, can be set anytime
+					chunk = (instrument.clock(), chunk)
 				jobdataq.append(chunk)
 			elif not overfull_warned:
 				# this is not exact with multiple threads (e.g.ThreadedTCPServer). 
@@ -24,7 +24,8 @@ Abstract base for text line logging.
 @author: Ruben Reifenberg
 """
 
-from rrlog.tool import tm_strftime
+from rrlog.tool import TimestampRenderer
+import re
 import time
 
 def tm_structconverter(secs, to_structtime=time.localtime):
@@ -39,50 +40,140 @@ def tm_structconverter(secs, to_structtime=time.localtime):
 	return to_structtime(secs),msecs
 
 
-#todo: new:Formatter-objects. Configured datefmt missing here
+# Formatter fields: python expression for each
+FIELDS = {
+	"message": "job.msg",
+	"cat": "job.cat",
+	"lineCount": "lineCount",
+	"pid": "job.pid",
+	"tid": "job.tid",
+	"threadname": "job.threadname",
+	"msgid": "job.msgid",
+	"asctime": "self.formatTime(job.ts)",
+	"created": "job.ts",
+	"msecs": "int((job.ts%1)*1000)",
+	"cfn": "job.cfn()",
+	"cln": "job.cln()",
+	"cfunc": "job.cfunc",
+	"cfuncTag": "(':::%s'%(job.cfunc) if job.cfunc != '' else '')", # ":::<cfunc>", empty at module level
+	"path": "job.pathStr(0)",
+	"tblen": "job.tblen",
+	"levelno": "LEVELNOS.get(job.cat,0)", # the number of the standard logging level
+	}
+
+# cat: standard logging level number, for the levelno field. Other cats are 0 (NOTSET).
+LEVELNOS = {
+	"C": 50,
+	"F": 50,
+	"E": 40,
+	"W": 30,
+	"I": 20,
+	"D": 10,
+	}
+
+# the names of the standard logging (LogRecord attributes), for convenience
+STDLIB_FIELDS = {
+	"msg": "message",
+	"levelname": "cat",
+	"process": "pid",
+	"thread": "tid",
+	"threadName": "threadname",
+	"module": "cfn",
+	"lineno": "cln",
+	"funcName": "cfunc",
+	}
+
+DEFAULT_FORMAT = "%(cat)1s %(lineCount)s.[%(pid)s:%(msgid)s@%(asctime)s] %(message)s %(cfuncTag)s %(path)s\n"
+
+# a literal %, or a field: name, flags/width/precision, conversion
+_FIELD_RE = re.compile(r"%(?:%|\((\w+)\)([#0 +-]*\d*(?:\.\d+)?)([diouxXeEfFgGcrsa]))")
+_NUMERIC = frozenset("diouxXeEfFgGc")
+
+
 class Formatter(object):
 	"""
 	This resembles the L{logging.__init__.Formatter} of the Python Logging Package
 	by using the same __init__ arguments. That allows conveniently replacing a formatter
 	object of "one world" (standard logging resp. rrlog) with a formatter of the "other world".
+	
+	The fmt is compiled into a function once, which computes only the fields used in the fmt.
 	"""
-	def __init__(self, fmt=None, datefmt=None):
+	def __init__(self, fmt=None, datefmt=None, specialKeys=()):
 		"""
 		Initialize the formatter with specified format strings.
 
-		Initialize the formatter either with the specified format string, or a
-		default as described above. Allow for specialized date formatting with
-		the optional datefmt argument (if omitted, you get the ISO8601 format).
+		:param fmt: format string with %(name)s fields. The names are the keys of L{FIELDS},
+		
+			the names of the standard logging in L{STDLIB_FIELDS}, or the specialKeys.
+			Numeric conversions (e.g. %(tid)d) give 0 for a missing value (None).
+			Default is L{DEFAULT_FORMAT}. A line end is appended if missing (like the terminator of a logging.StreamHandler).
+			
+		:param datefmt: strftime format for the asctime field, with an extension: %3N is milliseconds.
+		
+		:param specialKeys: names of fields that are items of the "special" dict of the log call ("" if missing)
+		
+		:raises ValueError: if the fmt has an unknown field name, or a conversion without a field name (like a bare %s)
 		"""
 		if datefmt is None:
 			datefmt = "%m/%d %H:%M:%S;%3N"
 		if fmt:
+			if not fmt.endswith("\n"):
+				fmt += "\n"
 			self._fmt = fmt
 		else:
-			self._fmt = "%(message)s"
+			self._fmt = DEFAULT_FORMAT
 		self.datefmt = datefmt
+		self._renderTs = TimestampRenderer(datefmt)
+		self._render = self._compile(self._fmt, frozenset(specialKeys))
+
+
+	def _compile(self, fmt, specialKeys):
+		"""
+		:returns: function(job, lineCount) that returns the formatted line
+		"""
+		if "%" in _FIELD_RE.sub("", fmt):
+			raise ValueError("a conversion without a %%(name) field, or an incomplete field in the fmt %r (use %%%% for a literal %%)"%(fmt))
+		exprs = []
+		def field(match):
+			name,spec,conversion = match.groups()
+			if name is None:
+				return "%%" # literal %
+			if name in specialKeys:
+				expr = "job.special.get(%r,'')"%(name)
+			else:
+				expr = FIELDS.get(STDLIB_FIELDS.get(name, name))
+				if expr is None:
+					raise ValueError("unknown field %r in the fmt %r. Known are %s, and the specialKeys %s"%(
+						name, fmt, sorted(set(FIELDS)|set(STDLIB_FIELDS)), sorted(specialKeys)))
+			if conversion in _NUMERIC:
+				expr = "(%s or 0)"%(expr) # None, e.g. the tid of a record without thread info
+			exprs.append(expr)
+			return "%"+spec+conversion
+		namespace = {
+			"self": self,
+			"LEVELNOS": LEVELNOS,
+			"FMT": _FIELD_RE.sub(field, fmt),
+			}
+		exec("def render(job, lineCount):\n\treturn FMT%%(%s)\n"%("".join(e+"," for e in exprs)), namespace)
+		return namespace["render"]
+
+
+	def formatTime(self, secs):
+		"""
+		:param secs: float, as returned by time.time()
+		:returns: str, secs formatted with the datefmt
+		"""
+		renderTs = self._renderTs
+		if renderTs.format != self.datefmt: # datefmt was modified
+			renderTs = self._renderTs = TimestampRenderer(self.datefmt)
+		return renderTs(secs)
 		
 		
 	def __call__(self, job, lineCount):
 		"""
 		:returns: formatting single-line string
 		"""
-		def cfunc():
-			if job.cfunc is not "": return ":::%s"%(job.cfunc)
-			else: return ""
-		return "%1s %s.[%s:%s@%s] %s %s %s\n"%(
-			job.cat,
-			lineCount,
-			job.pid,
-	#		job.threadname, # laestig, aber aktivierbar
-	#		job.tid,
-			job.msgid,
-			tm_strftime(self.datefmt,*tm_structconverter(job.ts)), #toopt: job could store (lazy created) msecs
-			job.msg,
-			#self.cfn_cln(job), # path-str includes the cfn/cln now
-			cfunc(),
-			job.pathStr(0),
-			)
+		return self._render(job, lineCount)
 
 defaultFormatter = Formatter()
 
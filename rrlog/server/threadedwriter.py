@@ -0,0 +1,140 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+@summary:
+Writes in a background thread, so that a slow writer (e.g. a database) doesn't delay the log server and other writers.
+@author: Ruben Reifenberg
+"""
+
+from rrlog.queueclient import QueueServerProxy, OVERFLOW_BLOCK
+
+
+class _WriterServer(object):
+	"""
+	Server for the L{_JobQueue}, passes the jobs to the writer.
+	"""
+	def __init__(self, writer):
+		self._writer = writer
+		self.written = 0
+		self.errors = 0
+
+
+	def log(self, job):
+		try:
+			self._writer.writeNow(job)
+		except Exception:
+			self.errors += 1
+			raise
+		self.written += 1
+
+
+	def flush(self):
+		flush = getattr(self._writer,"flush",None)
+		if flush is not None:
+			flush()
+
+
+	def close(self):
+		# the writer is not closed, but its buffer is written
+		self.flush()
+
+
+class _JobQueue(QueueServerProxy):
+	"""
+	Queue of MsgJobs (instead of records)
+	"""
+	def _cat(self, job):
+		return job.cat
+
+
+class ThreadedWriter(object):
+	"""
+	Wraps a writer, whose writeNow is called by a background thread.
+	Each ThreadedWriter has its own queue and thread. Give several of them to a L{rrlog.server.LogServer},
+	to write into e.g. a file and a database at once.
+	
+	The thread is a daemon; queued jobs are written at interpreter exit (atexit), or with an explicit L{flush} / L{close}.
+	The LogServer doesn't re-use jobs when it has a ThreadedWriter (see L{rrlog.server.MsgJobPool}).
+	The queue takes a copy of each job, so the observers may still modify the job (see L{rrlog.server.LogServer.__init__}).
+	
+	@ivar writer: the wrapped writer
+	@ivar maxBacklog: max.count of queued jobs so far
+	"""
+	threaded = True
+	
+	def __init__(self, writer, maxlen=10000, overflow=OVERFLOW_BLOCK, dropCats=("D",""), errorHandler="stderr"):
+		"""
+		:param writer: the writer to call in the background thread
+		:param maxlen, overflow, dropCats: see L{rrlog.queueclient.QueueServerProxy.__init__}
+		:param errorHandler: receives the exceptions of the writer. See L{rrlog.queueclient.QueueServerProxy.__init__}
+		"""
+		self.writer = writer
+		self._server = _WriterServer(writer)
+		self._queue = _JobQueue(
+			self._server,
+			maxlen=maxlen,
+			overflow=overflow,
+			dropCats=dropCats,
+			errorHandler=errorHandler,
+			)
+		self.maxBacklog = 0
+
+
+	def writeNow(self, job):
+		"""
+		Enqueues a copy of the job. Writes directly when closed.
+		"""
+		queue = self._queue
+		queue.log(job.copy_update({}))
+		backlog = queue.qsize()
+		if backlog > self.maxBacklog:
+			self.maxBacklog = backlog
+
+
+	def stats(self):
+		"""
+		:returns: dict with the counts of jobs: backlog (not yet written), maxBacklog, written, errors, dropped (queue overflow)
+		"""
+		return dict(
+			backlog=self._queue.qsize(),
+			maxBacklog=self.maxBacklog,
+			written=self._server.written,
+			errors=self._server.errors,
+			dropped=self._queue.dropped,
+			)
+
+
+	def flush(self, timeout=None):
+		"""
+		Blocks until all jobs queued so far are written, then flushes the writer if it has a flush() method.
+		:returns: True if the queue is empty, False on timeout
+		"""
+		return self._queue.flush(timeout)
+
+
+	def close(self, timeout=None):
+		"""
+		Writes all queued jobs, and stops the background thread. Later jobs are written directly.
+		The wrapped writer is not closed, but flushed if it has a flush() method.
+		"""
+		self._queue.close(timeout)
+
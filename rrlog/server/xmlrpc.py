@@ -30,6 +30,7 @@ Use it when the performance is good enough for you.
 """
 import pickle
 from rrlog import globalconst
+from rrlog import instrument
 #todo: rename -> xmlrpcserver; Keep package xmlrpc as transition package
 try:
 	#Py3:from xmlrpc.server import SimpleXMLRPCServer
@@ -53,7 +54,7 @@ class LogAdapter(object):
 		No threading, xmlrpc blocks until return
 		"""
 		try:
-			logdata = pickle.loads(logdata_ps.data)
+			logdata = self._loads(logdata_ps)
 		except Exception as e:
 			return "invalid pickle data:"+str(e)
 		try:
@@ -61,8 +62,33 @@ class LogAdapter(object):
 		except Exception as e:
 			return "log failed:"+str(e)
 		return ""
+
+
+	def log_batch(self, logdatas_ps):
+		"""
+		:param logdatas_ps: pickled list of logdata
+		"""
+		try:
+			logdatas = self._loads(logdatas_ps)
+		except Exception as e:
+			return "invalid pickle data:"+str(e)
+		try:
+			self.s.log_batch(logdatas)
+		except Exception as e:
+			return "log failed:"+str(e)
+		return ""
 		
 
+	def _loads(self, binary):
+		instruments = getattr(self.s,"instruments",None)
+		if instruments is None:
+			return pickle.loads(binary.data)
+		t0 = instrument.clock()
+		res = pickle.loads(binary.data)
+		instruments.add(instrument.DESERIALIZE, instrument.clock()-t0)
+		return res
+
+
 	def addClient(self):
 		"""
 		:rtype: int
@@ -111,6 +137,7 @@ def startServer(logServer, host="localhost", ports=(globalconst.DEFAULTPORT_XMLR
 	server = createSimpleXMLRPCServer(host,ports)
 	adapter = LogAdapter(logServer)
 	server.register_function(adapter.log, "log")
+	server.register_function(adapter.log_batch, "log_batch")
 	server.register_function(adapter.addClient, "addClient")
 	if readyMsg: print("log server ready. Available at host,port: %s"%(str(server.server_address)))
 	server.serve_forever()
@@ -28,12 +28,32 @@ import struct
 import rrlog
 from rrlog.globalconst import remotedumps,warn
 from rrlog import globalconst
+from rrlog import instrument
 
 
 class SerializeError(Exception):
 	pass
 
 
+def makeFrame(record):
+	"""
+	Serializes the record with a length prefix, as the socket server (LogRecordStreamHandler) expects it.
+	:rtype: bytes
+	:raises SerializeError:
+	"""
+	try:
+		s = remotedumps(record)
+	except Exception as e:
+		raise SerializeError(""""serialize log data: %s failed with:%s.\n
+			A possible reason is the usage of json or similar library (e.g. marshal)
+			which cannot serialize custom objects. Use basic datatypes (mubers,strings,containertypes) in this case,
+			or configure logging to use another serialize library (see manual).
+			"""%(record,e))
+	if isinstance(s, str): # json
+		s = s.encode("utf-8")
+	return struct.pack(">L", len(s)) + s
+
+
 class _SocketHandler(handlers.SocketHandler):
 	
 	def makePickle(self, record):
@@ -41,23 +61,7 @@ class _SocketHandler(handlers.SocketHandler):
 		Pickles the record in binary format with a length prefix, and
 		returns it ready for transmission across the socket.
 		"""
-#        ei = record.exc_info
-#        if ei:
-#            dummy = self.format(record) # just to get traceback text into record.exc_text
-#            record.exc_info = None  # to avoid Unpickleable error
-#        s = pickle.dumps(record.__dict__, 1)
-		try:
-			s = remotedumps(record)
-		except Exception as e:
-			raise SerializeError(""""serialize log data: %s failed with:%s.\n
-				A possible reason is the usage of json or similar library (e.g. marshal)
-				which cannot serialize custom objects. Use basic datatypes (mubers,strings,containertypes) in this case,
-				or configure logging to use another serialize library (see manual).
-				"""%(record,e))
-#        if ei:
-#            record.exc_info = ei  # for next handler
-		slen = struct.pack(">L", len(s))
-		return slen + s
+		return makeFrame(record)
 	
 	
 	def ping_seems_possible(self):
@@ -72,9 +76,11 @@ class _SocketHandler(handlers.SocketHandler):
 
 
 class LogServerProxy(object):
-	def __init__(self, host, ports):
+	def __init__(self, host, ports, instruments=None):
 		"""
+		:param instruments: None, or L{rrlog.instrument.Instruments} to measure the serialization
 		"""
+		self.instruments = instruments
 		self.connectedInitially = False
 		for port in ports:
 			handler = _SocketHandler(host,port)
@@ -101,16 +107,42 @@ class LogServerProxy(object):
 
 
 	def log(self, logdata):
-		self.handler.emit(logdata)
+		self._emit(rrlog.portable_jobdata(logdata))
+
+
+	def log_batch(self, logdatas):
+		"""
+		Sends the batch as a single frame. Requires a server of version >= 0.3.2
+		"""
+		self._emit({"batch":[rrlog.portable_jobdata(x) for x in logdatas]})
+
+
+	def _emit(self, obj):
+		instruments = self.instruments
+		if instruments is not None:
+			t0 = instrument.clock()
+			frame = makeFrame(obj)
+			instruments.add(instrument.SERIALIZE, instrument.clock()-t0)
+		# the handler lock keeps frames of concurrent threads from interleaving
+		self.handler.acquire()
+		try:
+			if instruments is None:
+				self.handler.emit(obj)
+			else:
+				self.handler.send(frame)
+		finally:
+			self.handler.release()
 
 
 
-def createClientLog(host="localhost", ports=(globalconst.DEFAULTPORT_SOCKET,), errorHandler=None, traceOffset=0, stackMax=5, extractStack=True, seFilesExclude=None):
+def createClientLog(host="localhost", ports=(globalconst.DEFAULTPORT_SOCKET,), errorHandler=None, traceOffset=0, stackMax=5, extractStack=True, seFilesExclude=None, instruments=None):
 	"""
+	:param instruments: see L{rrlog.instrument}, used by the Log and the server proxy
 	:returns: Log instance
 	"""
 	return rrlog.Log(
-		server = LogServerProxy(host, ports),
+		server = LogServerProxy(host, ports, instruments=instruments),
+		instruments=instruments,
 		traceOffset=traceOffset,
 		stackMax = stackMax,
 		errorHandler=errorHandler,
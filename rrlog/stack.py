@@ -0,0 +1,210 @@
+# Copyright (c) 2007 Ruben Reifenberg
+# 
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+# 
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+# 
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+
+
+"""
+@summary: Stack path extraction by walking the frame objects.
+Only the frames that end up in the call path are visited; no source lines are read
+(contrary to traceback.extract_stack, which formats the whole stack.)
+@author: Ruben Reifenberg
+"""
+
+import sys
+
+getframe = sys._getframe
+
+
+def skip(frame, count):
+	"""
+	:param count: int >= 0, how many frames to go back (towards the outermost frame)
+	:returns: the frame count levels below the given frame.
+		The outermost frame if the stack is not that deep.
+	"""
+	while count > 0:
+		back = frame.f_back
+		if back is None:
+			break
+		frame = back
+		count -= 1
+	return frame
+
+
+def depth(frame):
+	"""
+	Pointer chasing only; no frame is inspected.
+	
+	:returns: count of frames from the outermost frame up to the given frame (inclusive),
+		which is the len() of traceback.extract_stack() when called in that frame.
+	"""
+	res = 0
+	while frame is not None:
+		res += 1
+		frame = frame.f_back
+	return res
+
+
+def callpath(frame, stackMax, seFilesExclude=None):
+	"""
+	:param frame: the frame where the log call happened (this is the first path item)
+	:param stackMax: count of path items to collect (excluded files not counted)
+	:param seFilesExclude: None or callable, see L{rrlog.Log.__init__}
+	
+	:returns: path,cfuncname where path = [ (filename,lineno), ...], len >=0.
+		Excluded files appear as (None,None).
+		cfuncname is None if no frame was taken into the path.
+	"""
+	path = []
+	cfuncname = None
+	stackRest = stackMax
+	
+	while stackRest > 0 and frame is not None:
+		code = frame.f_code
+		filename = code.co_filename
+		if (seFilesExclude is None) or not seFilesExclude(filename):
+			stackRest -= 1
+			path.append( (filename,frame.f_lineno) )
+			if cfuncname is None:
+				cfuncname = code.co_name # special treatment: don't add it to every path item, we want it for the first only
+		else:
+			# add a "None" line indicating an item is omitted
+			path.append( (None,None) )
+		frame = frame.f_back
+		
+	return path,cfuncname
+
+
+class CallPathCache(object):
+	"""
+	Remembers the call path per call site, to avoid re-building the same path
+	(and re-running the seFilesExclude callable) with each log call.
+	
+	A call site is identified by the (code object identity, line number) of each frame visited.
+	(Not by the code object value: Equal code objects of different files compare equal, and hashing them is slow.)
+	The entries keep the code objects alive, so their ids are not re-used meanwhile.
+	The returned paths are tuples and shared between calls: Don't modify them.
+	
+	Both caches are cleared completely when they exceed maxSize.
+	
+	@ivar hits: count of call paths found in the cache
+	@ivar misses: count of call paths built
+	@ivar excludeHits: count of seFilesExclude verdicts found in the cache
+	@ivar excludeMisses: count of seFilesExclude calls
+	"""
+	def __init__(self, seFilesExclude=None, maxSize=1000):
+		"""
+		:param seFilesExclude: None or callable, see L{rrlog.Log.__init__}
+		:param maxSize: max.count of entries in each of the caches (paths, exclude verdicts)
+		"""
+		assert maxSize > 0, "maxSize must be >0, not %s"%(maxSize)
+		self._seFilesExclude = seFilesExclude
+		self._paths = {}
+		self._verdicts = {}
+		self.maxSize = maxSize
+		self.hits = 0
+		self.misses = 0
+		self.excludeHits = 0
+		self.excludeMisses = 0
+
+
+	def excluded(self, filename):
+		"""
+		:returns: True if seFilesExclude excludes the filename. Cached per filename.
+		"""
+		try:
+			res = self._verdicts[filename]
+		except KeyError:
+			self.excludeMisses += 1
+			if len(self._verdicts) >= self.maxSize:
+				self._verdicts.clear()
+			res = bool(self._seFilesExclude(filename))
+			self._verdicts[filename] = res
+		else:
+			self.excludeHits += 1
+		return res
+
+
+	def callpath(self, frame, stackMax):
+		"""
+		Same as the L{callpath} function, but cached.
+		
+		:returns: path,cfuncname where path = ( (filename,lineno), ...), len >=0
+		"""
+		key = [] # id(code),lineno,id(code),lineno, ...
+		codes = []
+		stackRest = stackMax
+		
+		if self._seFilesExclude is None:
+			while stackRest > 0 and frame is not None:
+				code = frame.f_code
+				key.append(id(code))
+				key.append(frame.f_lineno)
+				codes.append(code)
+				stackRest -= 1
+				frame = frame.f_back
+		else:
+			while stackRest > 0 and frame is not None:
+				code = frame.f_code
+				key.append(id(code))
+				key.append(frame.f_lineno)
+				codes.append(code)
+				if not self.excluded(code.co_filename):
+					stackRest -= 1
+				frame = frame.f_back
+
+		key = tuple(key)
+		try:
+			res = self._paths[key][0]
+		except KeyError:
+			self.misses += 1
+			if len(self._paths) >= self.maxSize:
+				self._paths.clear()
+			res = self._build(zip(codes, key[1::2]))
+			self._paths[key] = (res,codes) # the codes keep their ids valid
+		else:
+			self.hits += 1
+		return res
+
+
+	def _build(self, sites):
+		"""
+		:param sites: iterable of (code,lineno)
+		"""
+		path = []
+		cfuncname = None
+		for code,lineno in sites:
+			if (self._seFilesExclude is None) or not self.excluded(code.co_filename):
+				path.append( (code.co_filename,lineno) )
+				if cfuncname is None:
+					cfuncname = code.co_name
+			else:
+				path.append( (None,None) )
+		return tuple(path),cfuncname
+
+
+	def stats(self):
+		"""
+		:returns: dict with the hit/miss counters
+		"""
+		return dict(
+			hits=self.hits,
+			misses=self.misses,
+			excludeHits=self.excludeHits,
+			excludeMisses=self.excludeMisses,
+			)
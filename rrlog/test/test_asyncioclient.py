@@ -0,0 +1,189 @@
+# Copyright (c) 2007 Ruben Reifenberg.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met: 
+# 
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#    
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution. 
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@summary:
+Test the asyncio socket client
+@author: Ruben Reifenberg
+"""
+
+import asyncio
+import struct
+import threading
+
+from rrlog.globalconst import remoteloads
+from rrlog.asyncioclient import *
+
+
+class FrameServer(object):
+	"""
+	Reads the frames like the socket server does, records the messages.
+	"""
+	def __init__(self):
+		self.msgs = []
+		self.frames = [] # message count per frame
+		self.received = asyncio.Event()
+		
+	async def handle(self, reader, writer):
+		try:
+			while True:
+				slen = struct.unpack(">L", await reader.readexactly(4))[0]
+				jobdata = remoteloads(await reader.readexactly(slen))
+				if isinstance(jobdata, dict):
+					self.frames.append(len(jobdata["batch"]))
+					self.msgs.extend(x[5] for x in jobdata["batch"])
+				else:
+					self.frames.append(1)
+					self.msgs.append(jobdata[5])
+				self.received.set()
+		except asyncio.IncompleteReadError:
+			writer.close()
+			
+	async def start(self):
+		self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+		return self.server.sockets[0].getsockname()[1]
+		
+	async def wait_for(self, count):
+		while len(self.msgs) < count:
+			self.received.clear()
+			await asyncio.wait_for(self.received.wait(), 5)
+
+
+def test_send():
+	""" messages from the loop and from another thread arrive, basic template args are sent unformatted (the server formats them) """
+	async def main():
+		fs = FrameServer()
+		port = await fs.start()
+		log = createClientLog(host="127.0.0.1", port=port)
+		log("msg0")
+		log("x=%s", args=(1,))
+		t = threading.Thread(target=log, args=("from thread",))
+		t.start()
+		t.join()
+		await fs.wait_for(3)
+		log("msg3")
+		assert await log.drain(5)
+		await fs.wait_for(4)
+		await log.aclose()
+		fs.server.close()
+		return fs.msgs
+	msgs = asyncio.run(main())
+	assert msgs[:2] == ["msg0", "x=%s"]
+	assert sorted(msgs[2:]) == ["from thread", "msg3"]
+
+
+def test_batch():
+	""" many() sends a single frame """
+	async def main():
+		fs = FrameServer()
+		port = await fs.start()
+		log = createClientLog(host="127.0.0.1", port=port)
+		log.many(["a","b","c"])
+		await fs.wait_for(3)
+		await log.aclose()
+		fs.server.close()
+		return fs
+	fs = asyncio.run(main())
+	assert fs.msgs == ["a","b","c"]
+	assert fs.frames == [3]
+
+
+def test_no_server():
+	""" without a server the log call doesn't fail, the buffer is bounded """
+	async def main():
+		fs = FrameServer()
+		port = await fs.start()
+		fs.server.close()
+		await fs.server.wait_closed()
+		log = createClientLog(host="127.0.0.1", port=port, maxBuffer=3)
+		proxy = log._server
+		proxy.retrySecs = .05
+		for i in range(5):
+			log("msg%d"%i)
+		assert proxy.pending() == 3
+		assert proxy.dropped == 2
+		assert not await log.drain(.1)
+		
+		# a server comes up at that port, the buffered messages are sent
+		fs = FrameServer()
+		fs.server = await asyncio.start_server(fs.handle, "127.0.0.1", port)
+		assert await log.drain(5)
+		await fs.wait_for(3)
+		await log.aclose()
+		fs.server.close()
+		return fs.msgs
+	assert asyncio.run(main()) == ["msg2","msg3","msg4"]
+
+
+def test_close_discards():
+	""" close() counts and reports the messages it discards """
+	class Errors(object):
+		def __init__(self):
+			self.errors = []
+		def handleException(self, e):
+			self.errors.append(e)
+	async def main():
+		fs = FrameServer()
+		port = await fs.start()
+		fs.server.close()
+		await fs.server.wait_closed()
+		errors = Errors()
+		proxy = AsyncLogServerProxy("127.0.0.1", port, retrySecs=10, errorHandler=errors)
+		log = AsyncLog(server=proxy)
+		for i in range(3):
+			log("msg%d"%i)
+		log.close()
+		return proxy, errors.errors
+	proxy, errors = asyncio.run(main())
+	assert proxy.dropped == 3
+	assert proxy.pending() == 0
+	assert len(errors) == 1 and isinstance(errors[0], MessagesDiscarded)
+
+
+def test_backpressure():
+	""" while the transport is paused, messages wait in the buffer """
+	async def main():
+		fs = FrameServer()
+		port = await fs.start()
+		log = createClientLog(host="127.0.0.1", port=port)
+		proxy = log._server
+		log("msg0")
+		await fs.wait_for(1)
+		proxy._paused = True
+		log("msg1")
+		assert proxy.pending() == 1
+		proxy._transport.get_protocol().resume_writing()
+		assert proxy.pending() == 0
+		await fs.wait_for(2)
+		await log.aclose()
+		fs.server.close()
+		return fs.msgs
+	assert asyncio.run(main()) == ["msg0","msg1"]
+
+
+if __name__ == "__main__":
+	import sys
+	from rrlog.test import run
+	run(sys.argv[0])
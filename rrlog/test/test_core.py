@@ -211,6 +211,417 @@ class TestLogAndServer(object):
 		
 
 
+class _RecordingServer(object):
+	def __init__(self):
+		self.jobdatas = []
+	def addClient(self):
+		pass
+	def log(self, jobdata):
+		self.jobdatas.append(jobdata)
+
+
+def test_tblen():
+	""" the stack walk reports the same depth as a full traceback extraction """
+	import traceback
+	s = _RecordingServer()
+	l = Log(server=s, stackMax=2)
+	line_yFunction(l, "msg1")
+	expected = len(traceback.extract_stack())+3 # line_y, line_x, Log.__call__
+	assert s.jobdatas[-1][8] == expected, "tblen was %s not %s"%(s.jobdatas[-1][8],expected)
+	assert s.jobdatas[-1][7][0][1] == LINE_X
+	assert s.jobdatas[-1][7][1][1] == LINE_Y
+	assert s.jobdatas[-1][9] == "line_xFunction"
+	l.stackDepth = False
+	line_yFunction(l, "msg2")
+	assert s.jobdatas[-1][8] == 0
+	assert s.jobdatas[-1][7][0][1] == LINE_X
+
+
+def test_callpath_cache():
+	""" repeated call sites hit the cache, seFilesExclude runs once per file name """
+	calls = []
+	def seFilesExclude(fname):
+		calls.append(fname)
+		return False
+	s = _RecordingServer()
+	l = Log(server=s, stackMax=3, seFilesExclude=seFilesExclude)
+	for i in range(0,10):
+		line_yFunction(l, "msg%d"%(i))
+	stats = l.callpath_stats()
+	assert stats["misses"] == 1, stats
+	assert stats["hits"] == 9, stats
+	assert len(calls) == len(set(calls))
+	assert s.jobdatas[0][7] is s.jobdatas[-1][7] # the same path object
+	assert s.jobdatas[-1][7][0][1] == LINE_X
+
+
+def test_callpath_cache_files():
+	""" equal code objects of different files are different call sites """
+	source = "def f(log):\n\tlog('msg')\n"
+	fs = []
+	for fname in ("/srv/app/a.py", "/srv/app/b.py"):
+		namespace = {}
+		exec(compile(source, fname, "exec"), namespace)
+		fs.append(namespace["f"])
+	assert fs[0].__code__ == fs[1].__code__
+	s = _RecordingServer()
+	l = Log(server=s, stackMax=1)
+	for f in fs:
+		f(l)
+	assert [jd[7] for jd in s.jobdatas] == [(("/srv/app/a.py",2),), (("/srv/app/b.py",2),)]
+	assert l.callpath_stats()["misses"] == 2
+
+
+def test_identity():
+	""" pid,tid,threadname are taken from the cache but follow thread renames and forks """
+	import os
+	import threading
+	s = _RecordingServer()
+	l = Log(server=s, stackMax=0)
+	t = threading.current_thread()
+	oldname = t.name
+	try:
+		l("msg1")
+		assert s.jobdatas[-1][1:4] == (os.getpid(), t.ident, oldname)
+		t.name = "renamed"
+		l("msg2")
+		assert s.jobdatas[-1][3] == "renamed"
+	finally:
+		t.name = oldname
+
+	if hasattr(os, "fork") and hasattr(os, "register_at_fork"):
+		r,w = os.pipe()
+		childpid = os.fork()
+		if childpid == 0:
+			try:
+				l("msg3")
+				os.write(w, str(s.jobdatas[-1][1]).encode("ascii"))
+			finally:
+				os._exit(0)
+		os.close(w)
+		reported = int(os.read(r, 64))
+		os.close(r)
+		os.waitpid(childpid, 0)
+		assert reported == childpid
+
+
+class _MsgidWriter(object):
+	def __init__(self):
+		self.msgids = []
+	def writeNow(self, job):
+		self.msgids.append(job.msgid)
+
+
+def test_threads():
+	""" one Log hammered by many threads: msgids are unique and gap-free """
+	import threading
+	threadCount = 16
+	callCount = 500
+	s = _RecordingServer()
+	w = _MsgidWriter()
+	logs = (
+		Log(server=s, stackMax=3),
+		Log(server=LogServer(writer=w, jobhistSize=10), stackMax=3),
+		)
+	start = threading.Event()
+	def work(i):
+		start.wait()
+		for j in range(0,callCount):
+			for l in logs:
+				l("msg", special={"thread":i})
+	threads = [threading.Thread(target=work, args=(i,)) for i in range(0,threadCount)]
+	for t in threads: t.start()
+	start.set()
+	for t in threads: t.join()
+	expected = list(range(1,threadCount*callCount+1))
+	assert sorted([x[0] for x in s.jobdatas]) == expected
+	assert sorted(w.msgids) == expected
+
+
+def test_sticked_items():
+	""" sticked items are merged into special, without modifying the callers dict """
+	s = _RecordingServer()
+	l = Log(server=s, stackMax=0)
+	l.set_sticked_items({"ip":"1.2.3.4", "user":"a"})
+	special = {"user":"b"}
+	l("msg1", special=special)
+	assert s.jobdatas[-1][10] == {"ip":"1.2.3.4", "user":"b"}
+	assert special == {"user":"b"}
+	l.set_sticked_items({})
+	l("msg2")
+	assert s.jobdatas[-1][10] is None
+
+
+class _Counted(object):
+	strcount = 0
+	def __str__(self):
+		self.__class__.strcount += 1
+		return "counted"
+
+
+class _JobWriter(object):
+	def __init__(self):
+		self.jobs = []
+	def writeNow(self, job):
+		self.jobs.append(job)
+
+
+def test_sticked_context():
+	""" sticked() items are scoped to the with-block and to the thread / asyncio task """
+	import asyncio
+	import rrlog
+	s = _RecordingServer()
+	l = Log(server=s, stackMax=0)
+	l("none")
+	assert s.jobdatas[-1][10] is None
+	with l.sticked({"request":1, "user":"a"}) as items:
+		l("one")
+		assert s.jobdatas[-1][10] is items # not copied
+		with l.sticked({"user":"b"}):
+			l("two", special={"x":1})
+			assert dict(s.jobdatas[-1][10]) == {"request":1, "user":"b", "x":1}
+			assert type(rrlog.portable_jobdata(s.jobdatas[-1])[10]) is dict
+		l.set_sticked_items({"ip":"1.2.3.4", "request":0})
+		l("three")
+		assert s.jobdatas[-1][10] == {"ip":"1.2.3.4", "request":1, "user":"a"}
+		l.set_sticked_items({})
+		
+		t = threading.Thread(target=l, args=("thread",))
+		t.start()
+		t.join()
+		assert s.jobdatas[-1][10] is None
+	l("after")
+	assert s.jobdatas[-1][10] is None
+	
+	async def request(i):
+		with l.sticked({"request":i}):
+			await asyncio.sleep(0)
+			l("task")
+			return s.jobdatas[-1][10]["request"]
+	async def main():
+		return await asyncio.gather(*[request(i) for i in range(3)])
+	assert asyncio.run(main()) == [0,1,2]
+
+
+def test_deferred_format():
+	""" template and args are formatted by the server, only when the message is written """
+	import rrlog
+	w = _JobWriter()
+	l = Log(server=LogServer(writer=w), stackMax=0, catsDisable=("D",))
+	_Counted.strcount = 0
+	l("x=%s", "D", args=(_Counted(),))
+	assert _Counted.strcount == 0
+	assert len(w.jobs) == 0
+	
+	l("x=%s y=%s", args=(_Counted(),2))
+	job = w.jobs[-1]
+	assert _Counted.strcount == 0 # not yet formatted
+	assert job.template == "x=%s y=%s"
+	assert job.msg == "x=counted y=2"
+	assert job.msg == "x=counted y=2"
+	assert _Counted.strcount == 1
+	
+	l("%(a)s-%(b)s", args=({"a":1,"b":2},))
+	assert w.jobs[-1].msg == "1-2"
+	l("%s %s", args=(1,)) # wrong args count: no exception
+	assert w.jobs[-1].msg.startswith("%s %s <format error")
+	
+	# remote logging formats not-basic args before sending:
+	s = _RecordingServer()
+	l = Log(server=s, stackMax=0)
+	l("x=%s", args=(_Counted(),))
+	l("y=%s", args=(1,))
+	l("z")
+	assert rrlog.portable_jobdata(s.jobdatas[0])[5] == "x=counted"
+	assert len(rrlog.portable_jobdata(s.jobdatas[0])) == 11 # without args, as older servers expect
+	assert rrlog.portable_jobdata(s.jobdatas[1]) is s.jobdatas[1]
+	assert rrlog.portable_jobdata(s.jobdatas[2]) == s.jobdatas[2][:11]
+	from rrlog.server import MsgJob
+	assert MsgJob(*rrlog.portable_jobdata(s.jobdatas[2])).msg == "z"
+
+def test_cat_gate():
+	""" enabled(), catsEnable/catsDisable changes and for_cat() """
+	s = _RecordingServer()
+	l = Log(server=s, stackMax=1, catsEnable=["E","W"])
+	assert l.enabled("E")
+	assert not l.enabled("D")
+	debug = l.for_cat("D")
+	error = l.for_cat("E")
+	assert debug is l.for_cat("D")
+	assert not debug
+	debug("never")
+	assert len(s.jobdatas) == 0
+	line_yFunction(error, "error1")
+	assert s.jobdatas[-1][5] == "error1"
+	assert s.jobdatas[-1][6] == "E"
+	assert s.jobdatas[-1][7][0][1] == LINE_X # the caller of the bound log
+	
+	l.catsEnable = None
+	l.catsDisable = ("E",)
+	assert debug and not error
+	debug("debug1")
+	error("never")
+	assert s.jobdatas[-1][5] == "debug1"
+	
+	l.off()
+	assert not debug
+	assert not l.enabled("D")
+	l.on()
+	assert debug
+
+
+def test_collapse():
+	""" collapseSecs: repeated messages from one call site are counted, not logged """
+	s = _RecordingServer()
+	l = Log(server=s, stackMax=1, collapseSecs=60)
+	for i in range(5):
+		line_yFunction(l, "again")
+	assert len(s.jobdatas) == 1
+	line_yFunction(l, "other")
+	assert [jd[5] for jd in s.jobdatas] == ["again","again [repeated 4 times]","other"]
+	assert s.jobdatas[1][10] == {"repeated":4}
+	assert s.jobdatas[1][7] == s.jobdatas[0][7]
+	assert s.jobdatas[1][0] != s.jobdatas[0][0]
+	
+	# different args are different messages
+	for args in ((1,),(2,),([2],),([2],)):
+		l("x=%s", args=args)
+	assert len(s.jobdatas) == 6
+	
+	# a pending count is logged with flush
+	l.flush()
+	assert s.jobdatas[-1][5] == "x=%s [repeated 1 times]"
+	l.flush()
+	assert len(s.jobdatas) == 7
+	
+	# a pending count is logged at exit
+	import rrlog
+	for i in range(2):
+		l("exit")
+	assert l in rrlog._bursting
+	rrlog._endBursts()
+	assert s.jobdatas[-1][5] == "exit [repeated 1 times]"
+	
+	# expired
+	l.collapseSecs = 0
+	for i in range(3):
+		line_yFunction(l, "again")
+	assert len(s.jobdatas) >= 11
+
+
+def test_msgjob_reuse():
+	""" The server re-uses jobs of the history; jobs are slotted and copy_update works """
+	from rrlog import record
+	w = _JobWriter()
+	l = Log(server=LogServer(writer=w, jobhistSize=2), stackMax=2)
+	for i in range(4):
+		line_yFunction(l, "msg%d"%i)
+	assert w.jobs[0] is w.jobs[3] # re-used (dropped out of the history with msg2)
+	job = w.jobs[3]
+	assert not hasattr(job, "__dict__")
+	assert job.msg == "msg3"
+	assert job.cln() == LINE_X
+	assert job.cfn() == "test_core"
+	
+	l("x=%s", args=(1,), special={"a":1})
+	job = w.jobs[-1]
+	assert job.msg == "x=1" and job.special == {"a":1}
+	other = job.copy_update({"cat":"E", "path":((None,1),("f.py",2))})
+	assert (other.cat, job.cat) == ("E", "")
+	assert other.msg == "x=1" and other.msgid == job.msgid
+	assert other.cln() == 2
+	
+	# a client of an older version sends 11 items
+	s = LogServer(writer=w, jobhistSize=1)
+	s.log((1,2,3,"t",0.0,"old","",(),0,"",None,None))
+	s.log((1,2,3,"t",0.0,"old2","",(),0,"",None))
+	assert w.jobs[-1].msg == "old2"
+	assert len(record.FIELDS) == 12
+
+
+def test_jobhistory():
+	""" ring buffer of the recent jobs, jobs dropped out are re-used """
+	from rrlog.server import JobHistory
+	h = JobHistory(3)
+	assert len(h) == 0 and list(h) == []
+	assert [h.append(x) for x in "abcde"] == [None, None, None, "a", "b"]
+	assert list(h) == ["c","d","e"] and len(h) == 3
+	assert (h[0], h[-1], h[-3]) == ("c", "e", "c")
+	assert h[-2:] == ["d","e"] and h[::-1] == ["e","d","c"]
+	assert "d" in h and "a" not in h
+	for i in (3, -4):
+		try:
+			h[i]
+		except IndexError:
+			pass
+		else:
+			raise AssertionError("IndexError expected")
+	
+	seen = []
+	def observer(jobhist, writer):
+		seen.append([job.msg for job in jobhist[-2:]])
+	w = _JobWriter()
+	l = Log(server=LogServer(writer=w, observers=[observer], jobhistSize=5000), stackMax=1)
+	for i in range(5003):
+		l("m%d"%i)
+	assert seen[-1] == ["m5001","m5002"]
+	assert w.jobs[0] is w.jobs[5001] # re-used
+
+
+def test_path_memo():
+	""" formatted file names and paths are cached on the server and the job """
+	w = _JobWriter()
+	s = LogServer(writer=w)
+	path = (("/a/b.py",1),(None,2),(None,3),("/c/d.py",4))
+	assert s.pathAsStr(path) == "|b(1)<-...<-d(4)"
+	assert s.pathAsStr(path, 1) == "|<-...<-d(4)"
+	assert s.pathAsStr([list(item) for item in path]) == "|b(1)<-...<-d(4)" # a remote client's lists
+	assert len(s._pathStrs) == 2
+	s._cfnMode = s.CFN_FULL
+	assert s.pathAsStr(path) == "|_a_b-py(1)<-...<-_c_d-py(4)"
+	assert s.format_fname("/a/b.py") == "_a_b-py"
+	s._cfnMode = s.CFN_SHORT
+	
+	s.log((1,2,3,"t",0.0,"m","",path,0,"f",None,None))
+	job = w.jobs[-1]
+	assert job.pathStr(0) == "|b(1)<-...<-d(4)"
+	assert job.pathStr(0) is job.pathStr(0)
+	other = job.copy_update({"path":(("/x.py",5),)})
+	assert other.pathStr(0) == "|x(5)"
+	assert job.pathStr(0) == "|b(1)<-...<-d(4)"
+
+
+def test_many():
+	""" many() sends a batch with one call path; RichLog1 uses it """
+	from rrlog.contrib.richlog import RichLog1
+	class BatchServer(LogServer):
+		batches = 0
+		def log_batch(self, jobdatas):
+			self.batches += 1
+			LogServer.log_batch(self, jobdatas)
+	w = _JobWriter()
+	s = BatchServer(writer=w)
+	l = Log(server=s, stackMax=2, catsDisable=("D",))
+	assert l.many(["never"], cat="D") is None
+	ids = line_yFunction(l.many, ["a", ("x=%s",(1,))])
+	assert len(ids) == 2 and s.batches == 1
+	assert [j.msg for j in w.jobs] == ["a","x=1"]
+	assert w.jobs[1].cln() == LINE_X
+	assert w.jobs[0].path == w.jobs[1].path
+	assert l.many([]) == []
+	
+	RichLog1(l).dict({"k":"v"}, "d")
+	assert [j.msg for j in w.jobs[2:]] == ["d,dict:", "[0] k:v"]
+	assert s.batches == 2
+	
+	# a server without log_batch gets single log calls
+	rs = _RecordingServer()
+	l = Log(server=rs, stackMax=0)
+	with l.sticked({"request":1}):
+		l.many(["a","b"], special={"x":1})
+	assert [jd[5] for jd in rs.jobdatas] == ["a","b"]
+	assert dict(rs.jobdatas[1][10]) == {"request":1, "x":1}
+
 
 def setup_module(module):
 	global LINE_X # the line in this source file where line_xFunction calls the callable.
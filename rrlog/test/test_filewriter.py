@@ -196,6 +196,54 @@ def test_format_line():
 
 
 
+def test_flushpolicy():
+	"""
+	buffered lines are written by line count, category, timer, flush, rotation, close
+	"""
+	import os, tempfile, time
+	from rrlog.server import filewriter
+	from rrlog.server.filewriter import createLocalLog, FlushPolicy, FSYNC_CATS
+	tmp = tempfile.mkdtemp()
+	pattern = os.path.join(tmp, "log%d.txt")
+	def lines(i):
+		with open(pattern%(i), encoding="utf-8") as f:
+			return f.read().splitlines()
+	fsyncs = []
+	fsync = filewriter.fsync_
+	filewriter.fsync_ = fsyncs.append
+	try:
+		log = createLocalLog(pattern, rotateCount=2, rotateLineMin=6, format_line=lambda job,lineCount:job.msg+"\n",
+			flushPolicy=FlushPolicy(lines=3, millis=50, cats=("E",), fsync=FSYNC_CATS))
+		log("a")
+		log("b")
+		assert lines(0) == []
+		log("c") # 3 lines
+		assert lines(0) == ["a","b","c"]
+		log("d")
+		log("\u20ac error", "E")
+		assert lines(0)[-2:] == ["d","\u20ac error"]
+		assert len(fsyncs) == 1
+		log("f")
+		deadline = time.monotonic()+5
+		while lines(0)[-1] != "f" and time.monotonic() < deadline: # timer
+			time.sleep(0.01)
+		assert lines(0)[-1] == "f"
+		import threading
+		assert [t.name for t in threading.enumerate()].count("rrlog-flush") == 1 # a single flusher thread, no timer threads
+		log("g") # rotates, closes log0.txt
+		log.flush()
+		assert lines(1) == ["g"]
+		assert len(fsyncs) == 1
+		log("h")
+		assert lines(1) == ["g"]
+		log.close()
+		assert lines(1) == ["g","h"]
+	finally:
+		filewriter.fsync_ = fsync
+		import shutil
+		shutil.rmtree(tmp, ignore_errors=True)
+
+
 class FakeFile(object):
 	@classmethod
 	def reset(cls):
@@ -0,0 +1,93 @@
+# Copyright (c) 2007 Ruben Reifenberg.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met: 
+# 
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#    
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution. 
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@summary:
+Test the pipeline stage measurement
+@author: Ruben Reifenberg
+"""
+
+from rrlog import Log
+from rrlog.server import LogServer
+from rrlog.queueclient import QueueServerProxy
+from rrlog.instrument import *
+
+
+class NullWriter(object):
+	def writeNow(self, job):
+		pass
+
+
+def test_histogram():
+	h = Histogram()
+	assert h.stats() == {"count":0}
+	assert h.percentile(50) is None
+	for ns in (0, 1, 3, 1000, 1000, 5000):
+		h.add(ns)
+	assert h.buckets[0] == 1
+	assert h.buckets[2] == 1 # 3
+	assert h.buckets[10] == 2 # 1000
+	st = h.stats()
+	assert (st["count"], st["min"], st["max"]) == (6, 0, 5000)
+	assert st["mean"] == 7004/6.
+	assert st["p50"] == 4 # bucket of 3
+	assert st["p90"] == st["p99"] == 5000 # not more than the max
+	h.add(-5)
+	assert h.min == 0
+
+
+def test_stages():
+	""" a Log, a queue and a LogServer sharing one Instruments """
+	instruments = Instruments()
+	server = LogServer(writer=NullWriter(), instruments=instruments)
+	q = QueueServerProxy(server, instruments=instruments)
+	log = Log(server=q, instruments=instruments)
+	for i in range(10):
+		log("hello")
+	log.many(["a","b"])
+	q.flush()
+	st = instruments.stats()
+	assert st[STACK]["count"] == 11
+	assert st[BUILD]["count"] == 11
+	assert st[ENQUEUE]["count"] == 12
+	assert st[DEQUEUE]["count"] == 12
+	for stage in (FILTERS, WRITE, OBSERVERS):
+		assert st[stage]["count"] == 12
+	assert SERIALIZE not in st
+	assert instruments.histogram(WRITE).count == 12
+	
+	log.instruments = None
+	log("not measured")
+	q.close()
+	assert instruments.stats()[STACK]["count"] == 11
+	assert instruments.stats()[WRITE]["count"] == 13
+	instruments.reset()
+	assert instruments.stats() == {}
+
+
+if __name__ == "__main__":
+	import sys
+	from rrlog.test import run
+	run(sys.argv[0])
@@ -0,0 +1,180 @@
+# Copyright (c) 2007 Ruben Reifenberg.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met: 
+# 
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#    
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution. 
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@summary:
+Test the integration into the standard logging
+@author: Ruben Reifenberg
+"""
+
+import logging
+import threading
+
+from rrlog import Log
+from rrlog.server import LogServer
+from rrlog import logging23
+
+
+class JobWriter(object):
+	def __init__(self):
+		self.jobs = []
+	def writeNow(self, job):
+		self.jobs.append(job)
+
+
+class Counted(object):
+	strcount = 0
+	def __str__(self):
+		Counted.strcount += 1
+		return "counted"
+
+
+def create(name, handlerFactory, **logkwargs):
+	"""
+	:returns: logger, writer
+	"""
+	w = JobWriter()
+	log = Log(server=LogServer(writer=w), seFilesExclude=logging23.seFilesExclude, **logkwargs)
+	logger = logging.getLogger("rrlog.test.%s"%(name))
+	logger.propagate = False
+	logger.handlers = [handlerFactory(log)]
+	logger.setLevel(logging.DEBUG)
+	return logger, w
+
+
+def callingFunction(logger, *args):
+	logger.warning(*args)
+
+CALLING_LINE = callingFunction.__code__.co_firstlineno+1
+
+
+def test_handler():
+	logger, w = create("handler", logging23.handler)
+	callingFunction(logger, "x=%s", 1)
+	job = w.jobs[-1]
+	assert job.msg == "x=1"
+	assert job.cat == "W"
+	assert job.cln() == CALLING_LINE
+	assert job.cfunc == "callingFunction"
+
+
+def test_bridge():
+	""" caller info from the LogRecord, deferred formatting """
+	logger, w = create("bridge", logging23.bridge, catsDisable=("D",))
+	callingFunction(logger, "x=%s", 1)
+	job = w.jobs[-1]
+	assert job.msg == "x=1"
+	assert (job.cat, job.cfunc, job.cln(), job.cfn()) == ("W", "callingFunction", CALLING_LINE, "test_logging23")
+	assert len(job.path) == 1
+	assert (job.tid, job.threadname) == (threading.get_ident(), threading.current_thread().name)
+	
+	Counted.strcount = 0
+	logger.debug("%s", Counted())
+	assert len(w.jobs) == 1
+	assert Counted.strcount == 0 # category disabled: not formatted
+	logger.error("%(a)s-%(b)s", {"a":1, "b":2})
+	assert w.jobs[-1].msg == "1-2"
+	assert w.jobs[-1].template == "%(a)s-%(b)s"
+	logger.error(Counted())
+	assert w.jobs[-1].msg == "counted"
+	logger.error("100%")
+	assert w.jobs[-1].msg == "100%"
+	
+	handler = logger.handlers[0]
+	with handler.lock: # the standard Handler API needs the lock
+		handler.setFormatter(logging.Formatter())
+	handler.addFilter(lambda record: record.levelno > logging.ERROR)
+	logger.error("filtered")
+	assert w.jobs[-1].msg == "100%"
+
+
+def test_bridge_extraStack():
+	""" extraStack adds the callers of the logging call """
+	logger, w = create("bridge_stack", lambda log: logging23.bridge(log, extraStack=1))
+	callingFunction(logger, "x")
+	job = w.jobs[-1]
+	assert len(job.path) == 2
+	assert job.cln() == CALLING_LINE
+	assert job.path[1][0] == __file__.replace(".pyc",".py")
+	assert job.tblen > 0
+	
+	# emitted by another thread, the frame is not found: the LogRecord is used
+	record = logger.makeRecord(logger.name, logging.INFO, "elsewhere.py", 7, "y", (), None, "f")
+	logger.handle(record)
+	assert w.jobs[-1].path == (("elsewhere.py", 7),)
+
+
+def test_queued():
+	""" records are logged by the background thread, with the caller info of the LogRecord """
+	logger, w = create("queued", logging23.queued, catsDisable=("D",))
+	handler = logger.handlers[0]
+	for i in range(100):
+		callingFunction(logger, "x=%s", i)
+	logger.debug("not queued")
+	assert handler._queue.qsize() <= 100
+	assert handler.flush(5)
+	assert [job.msg for job in w.jobs] == ["x=%s"%(i) for i in range(100)]
+	job = w.jobs[-1]
+	assert (job.cat, job.cfunc, job.cln()) == ("W", "callingFunction", CALLING_LINE)
+	assert (job.tid, job.threadname) == (threading.get_ident(), threading.current_thread().name)
+	
+	handler.close()
+	logger.error("after close")
+	assert w.jobs[-1].msg == "after close" # logged directly
+
+
+def test_queued_overflow():
+	""" overflow policy with the LEVELMAP category """
+	blocked = threading.Event()
+	go = threading.Event()
+	class BlockingWriter(JobWriter):
+		def writeNow(self, job):
+			blocked.set()
+			go.wait(5)
+			JobWriter.writeNow(self, job)
+	w = BlockingWriter()
+	log = Log(server=LogServer(writer=w))
+	handler = logging23.queued(log, maxlen=2, overflow="drop-by-category", dropCats=("I",))
+	logger = logging.getLogger("rrlog.test.queued_overflow")
+	logger.propagate = False
+	logger.handlers = [handler]
+	logger.setLevel(logging.DEBUG)
+	
+	logger.error("first")
+	assert blocked.wait(5) # the thread is writing "first", the queue is empty
+	logger.info("i1")
+	logger.error("e1")
+	logger.error("e2") # drops i1
+	logger.info("i2") # dropped
+	assert handler.dropped == 2
+	go.set()
+	handler.close()
+	assert [job.msg for job in w.jobs] == ["first", "e1", "e2"]
+
+
+if __name__ == "__main__":
+	import sys
+	from rrlog.test import run
+	run(sys.argv[0])
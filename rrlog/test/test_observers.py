@@ -130,7 +130,50 @@ def test_filters():
 	assert len(fs) == 1 # old 2
 	assert len(fs[0].lines) == 2 # lines in first file
 	
+
+def test_drop_and_cats():
+	""" a filter can drop a job; filters and observers with cats are called for these cats only """
+	class MsgWriter(object):
+		def __init__(self):
+			self.msgs = []
+		def writeNow(self, job):
+			self.msgs.append(job.msg)
+	def dropX(jobhist, writer):
+		if jobhist[-1].msg == "x":
+			return DROP
+	calls = []
+	def errorsOnly(jobhist, writer):
+		calls.append(jobhist[-1].msg)
+	errorsOnly.cats = ("E",)
+	legacy = LegacyObserver(("e1","e2"))
+	legacy.cats = frozenset("E")
+	seen = []
+	def observer(jobhist, writer):
+		seen.append([job.msg for job in jobhist])
+	
+	w = MsgWriter()
+	s = LogServer(writer=w, filters=[dropX, errorsOnly], observers=[legacy, observer], jobhistSize=3)
+	log = Log(server=s, stackMax=1)
+	for msg,cat in (("a",""),("e1","E"),("x","E"),("b","W"),("e2","E")):
+		log(msg, cat)
+	assert w.msgs == ["a","e1","b","e2"]
+	assert calls == ["e1","e2"] # "x" dropped before
+	legacy.assert_finished()
+	assert seen[-1] == ["e1","b","e2"]
+	assert s.dropped == 1
+	
+	errorsOnly.cats = "E" # a str would match the "" cat too
+	for create in (lambda: LogServer(writer=w, filters=[errorsOnly]), lambda: s.addObserver(errorsOnly)):
+		try:
+			create()
+		except AssertionError:
+			pass
+		else:
+			raise AssertionError("str cats accepted")
 	
+	from rrlog.contrib.mail import CatBuffer, CatRule
+	assert CatBuffer([CatRule(("E",)), CatRule(("C","F"))]).cats == frozenset("ECF")
+	assert CatBuffer([CatRule(("E",)), CatRule(None)]).cats is None
 
 
 if __name__ == "__main__":
@@ -65,6 +65,8 @@ def logSequence(lineCount=25, msg="msg<%d>", errorLines=(), drop=True, modifylog
 			
 	return log
 
+LINE_LOG = logSequence.__code__.co_firstlineno+26 # the log(msg) line
+
 
 	
 
@@ -140,6 +142,40 @@ def test_format_line():
 
 
 
+def test_formatter_fmt():
+	"""
+	Formatter with a fmt, rrlog and standard logging field names
+	"""
+	from rrlog.server.textwriter import Formatter
+	FakeFile.reset()
+	log = logSequence(
+		lineCount=1,
+		kwargs={"format_line":Formatter("%(cat)s|%(levelname)s %(message)s 100%% %(cfunc)s:%(cln)d %(user)s%(other)s", specialKeys=("user","other"))}
+		)
+	log("hello", "W", special={"user":"u1"})
+	fs = FakeFile.instances
+	assert fs[0].lines[0] == "| msg<0> 100%% logSequence:%d \n"%(LINE_LOG)
+	assert fs[0].lines[1] == "W|W hello 100%% test_formatter_fmt:%d u1\n"%(test_formatter_fmt.__code__.co_firstlineno+10)
+	
+	class Job(object):
+		msg = "m"
+		cat = "W"
+		tid = None
+		def pathStr(self, imin):
+			raise AssertionError("path not in the fmt")
+	assert Formatter("%(msg)s")(Job(), 1) == "m\n"
+	assert Formatter("%(message)s|%(lineCount)3s\n")(Job(), 1) == "m|  1\n"
+	assert Formatter("%(levelno)d %(thread)d %(tid)s")(Job(), 1) == "30 0 None\n"
+	
+	for fmt in ("%(user)s", "%s %(msg)s", "%(msg)s %", "%(msg)"):
+		try:
+			Formatter(fmt)
+		except ValueError:
+			pass
+		else:
+			raise AssertionError("fmt %r accepted"%(fmt))
+
+
 class FakeFile(object):
 	@classmethod
 	def reset(cls):
@@ -0,0 +1,167 @@
+# Copyright (c) 2007 Ruben Reifenberg.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met: 
+# 
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#    
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution. 
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@summary:
+Test the queued (non-blocking) log calls
+@author: Ruben Reifenberg
+"""
+
+import threading
+import time
+
+from rrlog import Log
+from rrlog import queueclient
+from rrlog.queueclient import *
+
+
+class GateServer(object):
+	"""
+	Records the messages. Blocks each log call until the gate is opened.
+	"""
+	def __init__(self, opened=True):
+		self.msgs = []
+		self.gate = threading.Event()
+		self.entered = threading.Event()
+		if opened:
+			self.gate.set()
+	def addClient(self):
+		pass
+	def log(self, jobdata):
+		self.entered.set()
+		self.gate.wait()
+		self.msgs.append(jobdata[5])
+
+
+def fill(overflow, cats=("","","","")):
+	"""
+	logs "first" (which blocks the server), then msg0..msgN with the given cats into a queue of len 2
+	:returns: log, server, proxy
+	"""
+	s = GateServer(opened=False)
+	proxy = QueueServerProxy(s, maxlen=2, overflow=overflow, dropCats=("D",))
+	log = Log(server=proxy, stackMax=0)
+	log("first")
+	s.entered.wait(5) # the background thread took "first", the queue is empty now
+	for i,cat in enumerate(cats):
+		log("msg%d"%(i), cat)
+	return log,s,proxy
+
+
+def test_order_and_flush():
+	s = GateServer()
+	proxy = QueueServerProxy(s)
+	log = Log(server=proxy, stackMax=0)
+	for i in range(0,100):
+		log("msg%d"%(i))
+	log.flush()
+	assert s.msgs == ["msg%d"%(i) for i in range(0,100)]
+	assert proxy.qsize() == 0
+	log.close()
+	log("after close") # logged directly
+	assert s.msgs[-1] == "after close"
+
+
+def test_drop_newest():
+	log,s,proxy = fill(OVERFLOW_DROP_NEWEST)
+	s.gate.set()
+	log.close()
+	assert s.msgs == ["first","msg0","msg1"]
+	assert proxy.dropped == 2
+
+
+def test_drop_oldest():
+	log,s,proxy = fill(OVERFLOW_DROP_OLDEST)
+	s.gate.set()
+	log.close()
+	assert s.msgs == ["first","msg2","msg3"]
+	assert proxy.dropped == 2
+
+
+def test_drop_cats():
+	log,s,proxy = fill(OVERFLOW_DROP_CATS, cats=("D","E","D","E"))
+	s.gate.set()
+	log.close()
+	# msg2 is dropped as a new D message, msg0 is dropped to make room for msg3
+	assert s.msgs == ["first","msg1","msg3"]
+	assert proxy.dropped == 2
+
+
+def test_block():
+	s = GateServer(opened=False)
+	proxy = QueueServerProxy(s, maxlen=1, overflow=OVERFLOW_BLOCK)
+	log = Log(server=proxy, stackMax=0)
+	log("first")
+	s.entered.wait(5)
+	log("msg0") # fills the queue
+	t = threading.Thread(target=log, args=("msg1",))
+	t.start()
+	t.join(0.2)
+	assert t.is_alive() # blocked
+	s.gate.set()
+	t.join(5)
+	log.close()
+	assert s.msgs == ["first","msg0","msg1"]
+	assert proxy.dropped == 0
+
+
+def test_server_error():
+	class FailingServer(GateServer):
+		def log(self, jobdata):
+			raise ValueError("failed")
+	class Handler(object):
+		def __init__(self):
+			self.errors = []
+		def handleException(self, e):
+			self.errors.append(e)
+	handler = Handler()
+	log = Log(server=QueueServerProxy(FailingServer(), errorHandler=handler), stackMax=0)
+	log("msg")
+	log.close()
+	assert len(handler.errors) == 1
+
+
+def test_flush_timeout():
+	""" the timeout limits the whole flush, and the exit hook forgets closed proxies """
+	s = GateServer(opened=False)
+	proxy = QueueServerProxy(s)
+	assert proxy in queueclient._open
+	log = Log(server=proxy, stackMax=0)
+	log("first")
+	s.entered.wait(5)
+	log("msg0")
+	t0 = time.monotonic()
+	assert not proxy.flush(timeout=0.2)
+	assert time.monotonic()-t0 < 2
+	s.gate.set()
+	log.close()
+	assert proxy not in queueclient._open
+	assert s.msgs == ["first","msg0"]
+
+
+if __name__ == "__main__":
+	import sys
+	from rrlog.test import run
+	run(sys.argv[0])
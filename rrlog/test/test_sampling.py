@@ -0,0 +1,103 @@
+# Copyright (c) 2007 Ruben Reifenberg.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met: 
+# 
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#    
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution. 
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@summary:
+Test rate limiting / sampling per call site
+@author: Ruben Reifenberg
+"""
+
+from rrlog import Log
+from rrlog.sampling import *
+
+
+class Server(object):
+	def __init__(self):
+		self.jobdatas = []
+	def addClient(self):
+		pass
+	def log(self, jobdata):
+		self.jobdatas.append(jobdata)
+
+
+def test_tokenbucket():
+	b = TokenBucket(rate=2, burst=3)
+	assert [b.allow(0) for i in range(0,4)] == [True,True,True,False]
+	assert b.allow(0.5) # 1 token refilled
+	assert not b.allow(0.5)
+	assert [b.allow(10) for i in range(0,4)] == [True,True,True,False] # not more than burst
+
+
+def test_oneinn():
+	s = OneInN(3)
+	assert [s.allow(0) for i in range(0,7)] == [True,False,False,True,False,False,True]
+
+
+def test_windowcap():
+	c = WindowCap(2, windowSecs=10)
+	assert [c.allow(t) for t in (0,1,2,9)] == [True,True,False,False]
+	assert [c.allow(t) for t in (10,11,12)] == [True,True,False]
+
+
+def test_log():
+	s = Server()
+	log = Log(server=s, stackMax=0, sampler=Sampler({"D":lambda: OneInN(5)}))
+	for i in range(0,11):
+		log("debug%d"%(i), "D")
+		log("error%d"%(i), "E") # not limited
+	log("other", "D") # another call site, own limiter
+	
+	debugs = [x for x in s.jobdatas if x[6] == "D"]
+	assert [x[5] for x in debugs] == ["debug0","debug5","debug10","other"]
+	assert debugs[0][10] is None
+	assert debugs[1][10] == {"suppressed":4}
+	assert debugs[2][10] == {"suppressed":4}
+	assert debugs[3][10] is None
+	assert len([x for x in s.jobdatas if x[6] == "E"]) == 11
+
+
+def test_default():
+	t = [0]
+	s = Server()
+	log = Log(server=s, stackMax=0)
+	log.sampler = Sampler({}, default=lambda: WindowCap(1, windowSecs=10), clock=lambda: t[0])
+	special = {"x":1}
+	def callsite(i):
+		log("msg%d"%(i), special=special)
+	for i in range(0,3):
+		callsite(i)
+	t[0] = 10 # next window
+	log("other") # other call site
+	for i in range(3,5):
+		callsite(i)
+	assert [x[5] for x in s.jobdatas] == ["msg0","other","msg3"]
+	assert s.jobdatas[2][10] == {"x":1, "suppressed":2}
+	assert special == {"x":1}
+
+
+if __name__ == "__main__":
+	import sys
+	from rrlog.test import run
+	run(sys.argv[0])
@@ -0,0 +1,146 @@
+# Copyright (c) 2007 Ruben Reifenberg.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met: 
+# 
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+#    
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution. 
+# 
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+"""
+@summary:
+Test multiple writers, and writers in background threads
+@author: Ruben Reifenberg
+"""
+
+import threading
+
+from rrlog import Log
+from rrlog.server import LogServer
+from rrlog.server.threadedwriter import ThreadedWriter
+
+
+class JobWriter(object):
+	def __init__(self):
+		self.msgs = []
+	def writeNow(self, job):
+		self.msgs.append(job.msg)
+
+
+class GateWriter(JobWriter):
+	"""
+	Blocks each write until the gate is opened.
+	"""
+	def __init__(self):
+		JobWriter.__init__(self)
+		self.gate = threading.Event()
+	def writeNow(self, job):
+		self.gate.wait(5)
+		JobWriter.writeNow(self, job)
+
+
+class FailingWriter(object):
+	def writeNow(self, job):
+		if job.msg == "fail":
+			raise ValueError("failed")
+
+
+class Errors(object):
+	def __init__(self):
+		self.errors = []
+	def handleException(self, e):
+		self.errors.append(e)
+
+
+def test_multiple():
+	""" each writer writes each message, a failing writer doesn't stop the others """
+	w1, w2 = JobWriter(), JobWriter()
+	s = LogServer(writer=[w1, FailingWriter(), w2])
+	log = Log(server=s, errorHandler=None)
+	log("a")
+	try:
+		log("fail")
+	except ValueError:
+		pass
+	else:
+		raise AssertionError("ValueError expected")
+	assert w1.msgs == w2.msgs == ["a", "fail"]
+	assert s.writer_stats() == [None, None, None]
+
+
+def test_threaded():
+	""" a slow writer doesn't delay the others """
+	fast, slow = JobWriter(), GateWriter()
+	errors = Errors()
+	tslow = ThreadedWriter(slow)
+	tfailing = ThreadedWriter(FailingWriter(), errorHandler=errors)
+	s = LogServer(writer=[ThreadedWriter(fast), tslow, tfailing], jobhistSize=1)
+	log = Log(server=s)
+	for msg in ("a", "fail", "b"):
+		log(msg)
+	assert s._writers[0].flush(5)
+	assert fast.msgs == ["a", "fail", "b"]
+	assert slow.msgs == []
+	stats = tslow.stats()
+	assert stats["written"] == 0 and stats["backlog"] == 3 and stats["maxBacklog"] >= 2
+	
+	slow.gate.set()
+	log.flush() # flushes the server, i.e. the threaded writers
+	assert slow.msgs == ["a", "fail", "b"]
+	assert tslow.stats()["backlog"] == 0
+	assert tfailing.stats()["errors"] == 1 and tfailing.stats()["written"] == 2
+	assert [str(e) for e in errors.errors] == ["failed"]
+	assert [stats["written"] for stats in s.writer_stats()] == [3, 3, 2]
+	
+	s.close()
+	log("c") # written directly
+	assert fast.msgs[-1] == slow.msgs[-1] == "c"
+
+
+def test_threaded_buffer():
+	""" flush and close reach a buffering writer; observers modify the job, not the queued copy """
+	import os, shutil, tempfile
+	from rrlog.server.filewriter import FileLogWriter, FileConfig, FlushPolicy
+	tmp = tempfile.mkdtemp()
+	path = os.path.join(tmp, "log.txt")
+	def lines():
+		with open(path, encoding="utf-8") as f:
+			return f.read().splitlines()
+	def observer(jobhist, writer):
+		jobhist[-1].msg = "modified"
+	try:
+		fw = FileLogWriter(FileConfig(path), format_line=lambda job,lineCount:job.msg+"\n", flushPolicy=FlushPolicy(millis=None))
+		tw = ThreadedWriter(GateWriter())
+		log = Log(server=LogServer(writer=[ThreadedWriter(fw), tw], observers=[observer]))
+		log("a")
+		tw.writer.gate.set()
+		log.flush()
+		assert lines() == ["a"]
+		assert tw.writer.msgs == ["a"]
+		log("b")
+		log.close()
+		assert lines() == ["a","b"]
+	finally:
+		shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+	import sys
+	from rrlog.test import run
+	run(sys.argv[0])
@@ -39,6 +39,43 @@ def test_mStrftime():
 	assert mStrftime(d,"%3N") == "123", "got "+mStrftime(d,"%3N")
 	assert mStrftime(d,"%Y-%3N") == "2007-123"
 	assert mStrftime(d,"%3N-%Y") == "123-2007"
+	assert mStrftime(datetime(2007,5,10,10,16,59,5000),"%S;%3N") == "59;005"
+
+
+def test_TimestampRenderer():
+	import time
+	calls = []
+	def gmtime(secs):
+		calls.append(secs)
+		return time.gmtime(secs)
+	r = TimestampRenderer("%H:%M:%S;%3N", to_structtime=gmtime)
+	for secs in (59.0, 59.5, 59.9994, 60.0015, 60.25, 3600*24+0.0425):
+		assert r(secs) == tm_strftime(r.format, time.gmtime(secs), int((secs%1)*1000))
+	assert r(59.5) == "00:00:59;500"
+	assert r(60.0015) == "00:01:00;001"
+	assert len(calls) == 5 # once per second change: 59, 60, 86400, 59, 60
+	
+	assert TimestampRenderer("%3N-%Y-%3N", time.gmtime)(0.123) == "123-1970-123"
+	assert TimestampRenderer("%Y", time.gmtime)(0.123) == "1970"
+	r = TimestampRenderer("%Y-%3N")
+	assert r.render_datetime(datetime(2007,5,10,10,16,59,123456)) == "2007-123"
+	assert r.render_datetime(datetime(2008,5,10,10,16,59,5000)) == "2008-005"
+	
+	if hasattr(time, "tzset"):
+		import os
+		tz = os.environ.get("TZ")
+		os.environ["TZ"] = "Europe/Berlin"
+		time.tzset()
+		try:
+			r = TimestampRenderer("%H:%M:%S;%3N")
+			assert r(1616893199.5) == "01:59:59;500" # last second of CET
+			assert r(1616893200.5) == "03:00:00;500" # CEST
+		finally:
+			if tz is None:
+				del os.environ["TZ"]
+			else:
+				os.environ["TZ"] = tz
+			time.tzset()
 
 def test_ListRotator():
 	r = ListRotator(())
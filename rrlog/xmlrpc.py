@@ -26,6 +26,7 @@ The client (i.e.application) side of an XMLRPC log connection.
 """
 
 import pickle
+import threading
 try: 
 	#Py3: from xmlrpc.client import ServerProxy, Error, Binary
 	#Py2: from xmlrpclib import ServerProxy, Error, Binary
@@ -35,6 +36,7 @@ except ImportError:
 	
 import rrlog
 from rrlog import globalconst
+from rrlog import instrument
 
 
 class XMLRPCLogException(Exception):
@@ -102,11 +104,14 @@ class LogServerProxy(object):
 	First method call must be addClient,
 	since this establishes the server connection.
 	"""
-	def __init__(self, host, ports):
+	def __init__(self, host, ports, instruments=None):
 		"""
+		:param instruments: None, or L{rrlog.instrument.Instruments} to measure the serialization
 		"""
+		self.instruments = instruments
 		self.host = host
 		self.ports = ports
+		self._lock = threading.Lock() # the ServerProxy connection can't be shared by concurrent calls
 
 
 	def addClient(self): # Refactoring. addClient is to be removed
@@ -117,24 +122,56 @@ class LogServerProxy(object):
 
 
 	def log(self, logdata):
-		
+		logdata = rrlog.portable_jobdata(logdata)
+		self._lock.acquire()
 		try:
-			ok = self.server.log(
-				xclient.Binary(pickle.dumps(logdata))
-				)
-		except Exception as e:
-			raise XMLRPCConnectionException("%s"%(e),msgid=logdata[0])
-		else:
-			if ok != "":
-				raise XMLRPCServerException(ok,msgid=logdata[0])
-
-
-def createClientLog(host="localhost", ports=(globalconst.DEFAULTPORT_XMLRPC,), errorHandler=None, traceOffset=0, stackMax=5, extractStack=True, seFilesExclude=None):
+			try:
+				ok = self.server.log(self._dumps(logdata))
+			except Exception as e:
+				raise XMLRPCConnectionException("%s"%(e),msgid=logdata[0])
+		finally:
+			self._lock.release()
+			
+		if ok != "":
+			raise XMLRPCServerException(ok,msgid=logdata[0])
+
+
+	def log_batch(self, logdatas):
+		"""
+		Sends the batch with a single request.
+		"""
+		logdatas = [rrlog.portable_jobdata(x) for x in logdatas]
+		self._lock.acquire()
+		try:
+			try:
+				ok = self.server.log_batch(self._dumps(logdatas))
+			except Exception as e:
+				raise XMLRPCConnectionException("%s"%(e),msgid=logdatas[0][0])
+		finally:
+			self._lock.release()
+			
+		if ok != "":
+			raise XMLRPCServerException(ok,msgid=logdatas[0][0])
+
+
+	def _dumps(self, obj):
+		instruments = self.instruments
+		if instruments is None:
+			return xclient.Binary(pickle.dumps(obj))
+		t0 = instrument.clock()
+		res = xclient.Binary(pickle.dumps(obj))
+		instruments.add(instrument.SERIALIZE, instrument.clock()-t0)
+		return res
+
+
+def createClientLog(host="localhost", ports=(globalconst.DEFAULTPORT_XMLRPC,), errorHandler=None, traceOffset=0, stackMax=5, extractStack=True, seFilesExclude=None, instruments=None):
 	"""
+	:param instruments: see L{rrlog.instrument}, used by the Log and the server proxy
 	:returns: Log instance
 	"""
 	return rrlog.Log(
-		server = LogServerProxy(host, ports),
+		server = LogServerProxy(host, ports, instruments=instruments),
+		instruments=instruments,
 		traceOffset=traceOffset,
 		stackMax = stackMax,
 		errorHandler=errorHandler,